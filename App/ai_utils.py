@@ -1,7 +1,12 @@
 import json
 import os
-from groq import Groq, InternalServerError, RateLimitError, APIStatusError
+import re
+import time
 from typing import List, Dict
+from usage_ledger import record_request, record_rate_limit, record_timeout, record_model_result, has_budget, estimate_tokens
+from app_config import get_config_section
+from row_utils import VERB_FIELDS, SUBS_FIELDS, split_row, validate_row, parse_rows, rows_to_text, german_key
+from llm_providers import PROVIDER_TYPES, ProviderRateLimitError, ProviderTimeoutError, ProviderError, split_model_name
 
 
 # Загрузка API-ключей из файла
@@ -19,52 +24,163 @@ API_KEYS = load_api_keys()
 # Глобальный клиент (будет обновляться при смене ключа)
 current_client_index = 0
 
+# providers by (provider name, api key), so every key keeps one connection pool
+PROVIDER_CACHE = {}
+
+
+def get_provider_config(provider_name):
+    providers = get_config_section("llm")["providers"]
+    if provider_name not in providers:
+        raise ValueError(f"Unknown LLM provider '{provider_name}'.")
+    return providers[provider_name]
+
+
+def get_client(provider_name="groq"):
+    # providers with key rotation get the current key from api_keys.json, others use their configured key
+    provider_config = get_provider_config(provider_name)
+    provider_class = PROVIDER_TYPES[provider_config["type"]]
+    if provider_class.uses_key_rotation:
+        key_info = API_KEYS[current_client_index]
+        print(f"Using API key from: {key_info['name']}")  # Для отладки
+        cache_key = (provider_name, key_info["key"])
+    else:
+        cache_key = (provider_name, provider_config.get("api_key", ""))
+    if cache_key not in PROVIDER_CACHE:
+        # a stalled connection is abandoned after the deadline instead of blocking the worker
+        timeout = get_config_section("deadlines")["llm_seconds"] or None
+        if provider_class.uses_key_rotation:
+            PROVIDER_CACHE[cache_key] = provider_class(api_key=cache_key[1], timeout=timeout)
+        else:
+            PROVIDER_CACHE[cache_key] = provider_class(provider_config["base_url"], cache_key[1], timeout=timeout)
+    return PROVIDER_CACHE[cache_key]
 
-def get_client() -> Groq:
-    global current_client_index
-    key_info = API_KEYS[current_client_index]
-    print(f"Using API key from: {key_info['name']}")  # Для отладки
-    return Groq(api_key=key_info["key"])
 
+def close_clients():
+    # closes the connection pools of all cached providers
+    while PROVIDER_CACHE:
+        PROVIDER_CACHE.popitem()[1].close()
 
-def make_request_with_retry(messages, model="llama-3.3-70b-versatile"):
+
+def make_request_with_retry(messages, model="llama-3.3-70b-versatile", provider="groq", **kwargs):
     global current_client_index
-    max_retries = len(API_KEYS)  # Количество попыток = количество ключей
-    last_exception = None
+    provider_class = PROVIDER_TYPES[get_provider_config(provider)["type"]]
+    # a provider without key rotation (local server) gets one attempt under its own name
+    max_retries = len(API_KEYS) if provider_class.uses_key_rotation else 1  # Количество попыток = количество ключей
+    estimated_tokens = estimate_tokens(messages)
 
     for attempt in range(max_retries):
+        key_name = API_KEYS[current_client_index]['name'] if provider_class.uses_key_rotation else provider
+        # keys that ran out of today's budget are skipped instead of waiting for a 429
+        if not has_budget(key_name, model, estimated_tokens):
+            print(f"Daily budget of key '{key_name}' for {model} is used up. Switching key...")
+            if provider_class.uses_key_rotation:
+                current_client_index = (current_client_index + 1) % len(API_KEYS)
+            continue
+
         try:
-            client = get_client()
-            chat_completion = client.chat.completions.create(
-                model=model,
-                messages=messages,
-            )
-            return chat_completion.choices[0].message.content
+            client = get_client(provider)
+            start = time.perf_counter()
+            result = client.complete(messages, model, **kwargs)
+            record_request(key_name, model, result.prompt_tokens, result.completion_tokens,
+                           time.perf_counter() - start)
+            return result.content
+
+        except ProviderRateLimitError:
+            print(f"Rate limit exceeded with key '{key_name}'. Switching key...")
+            record_rate_limit(key_name, model)
+            if provider_class.uses_key_rotation:
+                current_client_index = (current_client_index + 1) % len(API_KEYS)
 
-        except RateLimitError as e:
-            if e.status_code == 429:
-                print(f"Rate limit exceeded with key '{API_KEYS[current_client_index]['name']}'. Switching key...")
+        except ProviderTimeoutError:
+            print(f"Request with key '{key_name}' ran past its deadline. Switching key...")
+            record_timeout(key_name, model)
+            if provider_class.uses_key_rotation:
                 current_client_index = (current_client_index + 1) % len(API_KEYS)
-            else:
-                raise e
 
-        except APIStatusError as e:
-            if e.status_code == 429:
-                print(f"Status 429 with key '{API_KEYS[current_client_index]['name']}'. Switching key...")
+        except ProviderError as e:
+            # a bad request or key fails the same way with every key
+            if not e.transient:
+                raise
+            print(f"Server error with key '{key_name}': {str(e)}. Switching key...")
+            if provider_class.uses_key_rotation:
                 current_client_index = (current_client_index + 1) % len(API_KEYS)
-            else:
-                raise e
 
-        except Exception as e:
-            print(f"Unexpected error with key '{API_KEYS[current_client_index]['name']}': {str(e)}")
-            current_client_index = (current_client_index + 1) % len(API_KEYS)
+    # make_stage_request moves on to the next model of the chain on this error
+    raise RuntimeError("All API keys have been rate-limited or timed out. Try again later.")
+
+
+def valid_line_ratio(content, field_count):
+    # share of non-empty lines that form a valid row with field_count fields
+    lines = [line for line in content.splitlines() if line.strip()]
+    if not lines:
+        return 0.0
+    valid = sum(1 for line in lines if not validate_row(split_row(line), field_count))
+    return valid / len(lines)
+
+
+def validate_clean_output(content):
+    # the cleaned list should be one short item per line
+    lines = [line for line in content.splitlines() if line.strip()]
+    if not lines:
+        return False
+    short = sum(1 for line in lines if len(line.split()) <= 4 and ";" not in line)
+    return short / len(lines) >= get_config_section("llm")["min_valid_ratio"]
+
+
+def validate_json_output(content):
+    try:
+        return isinstance(json.loads(content), dict)
+    except ValueError:
+        return False
+
+
+# validators of every stage, an answer that fails goes to the next model of the chain
+STAGE_VALIDATORS = {
+    "clean": validate_clean_output,
+    "verbs": lambda content: valid_line_ratio(content, len(VERB_FIELDS)) >= get_config_section("llm")["min_valid_ratio"],
+    "except_verbs": lambda content: valid_line_ratio(content, len(SUBS_FIELDS)) >= get_config_section("llm")["min_valid_ratio"],
+    "classify": validate_json_output,
+}
+
+
+def make_stage_request(stage, messages, validate=None, **kwargs):
+    """
+    Sends a request through the model chain of a stage: the first model whose
+    answer passes validation wins. A rate-limited model (all keys used up) or
+    an invalid answer moves on to the next model. The answer of the last model
+    is returned even if invalid, so the user can still fix it in the editor.
+    """
+    models = get_config_section("llm")["stage_models"][stage]
+    validate = validate or STAGE_VALIDATORS.get(stage)
+    content = None
+    last_error = None
+
+    for index, model_name in enumerate(models):
+        # chain entries may name a provider, e.g. "local:qwen2.5-7b-instruct"
+        provider, model = split_model_name(model_name, get_config_section("llm")["providers"])
+        start = time.perf_counter()
+        try:
+            content = make_request_with_retry(messages, model=model, provider=provider, **kwargs)
+        except RuntimeError as e:
+            print(f"Model {model} is rate-limited or timed out for stage '{stage}': {e}")
+            record_model_result(stage, model_name, False, time.perf_counter() - start)
+            last_error = e
+            continue
+
+        accepted = validate is None or validate(content)
+        record_model_result(stage, model_name, accepted, time.perf_counter() - start)
+        if accepted:
+            return content
+        if index < len(models) - 1:
+            print(f"Answer of {model} failed validation for stage '{stage}', trying next model...")
 
-    raise RuntimeError("All API keys have been rate-limited. Try again later.")
+    if content is None:
+        raise last_error
+    return content
 
 
 # === Функция clean_tokenized_text ===
-def clean_tokenized_text(text):
-    instruction = """You are given a list of German vocabulary items, including nouns with articles, verbs, adjectives, and category headings such as "Lernwortschatz", "Kleidung", "Gegenstände", "Im Kaufhaus", and "Weitere wichtige Wörter". Your task is to process the input as follows:
+CLEAN_INSTRUCTION = """You are given a list of German vocabulary items, including nouns with articles, verbs, adjectives, and category headings such as "Lernwortschatz", "Kleidung", "Gegenstände", "Im Kaufhaus", and "Weitere wichtige Wörter". Your task is to process the input as follows:
 
 1. **Remove all category headings** — skip any lines that are section titles (e.g., "Kleidung", "Im Kaufhaus", etc.).
 2. **Process each lexical item**:
@@ -77,17 +193,18 @@ def clean_tokenized_text(text):
 
 Only return the final formatted list with no additional text."""
 
+
+def clean_tokenized_text(text):
     messages = [
-        {"role": "system", "content": instruction},
+        {"role": "system", "content": CLEAN_INSTRUCTION},
         {"role": "user", "content": text},
     ]
 
-    return make_request_with_retry(messages)
+    return make_stage_request("clean", messages)
 
 
 # === Функция extract_verbs ===
-def extract_verbs(text):
-    instruction_step1 = """
+VERBS_INSTRUCTION = """
 You will receive a list of German words containing nouns, verbs, and adjectives. Your task is to:
 
 1. **Identify only the verbs** in their infinitive form (e.g., "anprobieren", "zahlen", "mögen").
@@ -106,17 +223,18 @@ You will receive a list of German words containing nouns, verbs, and adjectives.
 Process all verbs in the input list and output the result as a clean, line-by-line list.
 """
 
+
+def extract_verbs(text):
     message = [
-        {"role": "system", "content": instruction_step1},
+        {"role": "system", "content": VERBS_INSTRUCTION},
         {"role": "user", "content": text},
     ]
 
-    return make_request_with_retry(message)
+    return make_stage_request("verbs", message)
 
 
 # === Функция extract_except_verbs ===
-def extract_except_verbs(text):
-    instruction_step1 = """
+EXCEPT_VERBS_INSTRUCTION = """
 You are given a list of German words, one per line. Your task is to process the list as follows:
 
 1. **Remove all verbs** from the list. Verbs are words that do not have a definite article (der, die, das) and typically end in -en or -n (e.g. anprobieren, anziehen, trainieren, zahlen, gehören, mögen, schauen). These must be excluded from the output.
@@ -148,9 +266,262 @@ Input: schauen → verb → skip
 Process all lines accordingly.
 """
 
+
+def extract_except_verbs(text):
     message = [
-        {"role": "system", "content": instruction_step1},
+        {"role": "system", "content": EXCEPT_VERBS_INSTRUCTION},
         {"role": "user", "content": text},
     ]
 
-    return make_request_with_retry(message)
\ No newline at end of file
+    return make_stage_request("except_verbs", message)
+
+
+# === Упаковка нескольких юнитов в один запрос ===
+STAGE_INSTRUCTIONS = {
+    "clean": CLEAN_INSTRUCTION,
+    "verbs": VERBS_INSTRUCTION,
+    "except_verbs": EXCEPT_VERBS_INSTRUCTION,
+}
+
+STAGE_FUNCTIONS = {
+    "clean": clean_tokenized_text,
+    "verbs": extract_verbs,
+    "except_verbs": extract_except_verbs,
+}
+
+PACKING_INSTRUCTION = """
+
+The input consists of several independent sections. Each section starts with a line "### UNIT <n>".
+Apply the instructions above to every section separately. Answer with the same "### UNIT <n>" lines,
+in the same order, each followed only by the output for that section. Output every section, even if
+its result is empty, and do not add any other text."""
+
+SECTION_HEADER = re.compile(r"^\s*#+\s*UNIT\s+(\d+)\s*$", re.IGNORECASE)
+
+
+def pack_sections(texts):
+    return "\n".join(f"### UNIT {index}\n{text.strip()}" for index, text in enumerate(texts, 1))
+
+
+def split_sections(content, count):
+    # answer of a packed request -> one text per unit, None if the sections don't match
+    sections = {}
+    current = None
+    for line in content.splitlines():
+        match = SECTION_HEADER.match(line)
+        if match:
+            current = int(match.group(1))
+            if current in sections:
+                return None
+            sections[current] = []
+        elif current is not None:
+            sections[current].append(line)
+    if sorted(sections) != list(range(1, count + 1)):
+        return None
+    return ["\n".join(sections[index]).strip() for index in range(1, count + 1)]
+
+
+def pack_groups(texts):
+    # consecutive groups of unit indexes that fit into one request
+    options = get_config_section("llm")
+    groups = []
+    group = []
+    size = 0
+    for index, text in enumerate(texts):
+        if group and (len(group) >= options["pack_max_units"] or size + len(text) > options["pack_max_chars"]):
+            groups.append(group)
+            group, size = [], 0
+        group.append(index)
+        size += len(text)
+    if group:
+        groups.append(group)
+    return groups
+
+
+def run_stage_packed(stage, texts):
+    """
+    Runs a text stage for several small units with one request per group, so the
+    long system prompt is sent once per group instead of once per unit. The
+    answer is split back per unit and every section is validated; units whose
+    section is missing or invalid are sent again on their own.
+    """
+    results = [None] * len(texts)
+    validate = STAGE_VALIDATORS[stage]
+    for group in pack_groups(texts):
+        if len(group) == 1:
+            results[group[0]] = STAGE_FUNCTIONS[stage](texts[group[0]])
+            continue
+        messages = [
+            {"role": "system", "content": STAGE_INSTRUCTIONS[stage] + PACKING_INSTRUCTION},
+            {"role": "user", "content": pack_sections([texts[index] for index in group])},
+        ]
+        sections = None
+        try:
+            content = make_stage_request(stage, messages,
+                                         validate=lambda answer: split_sections(answer, len(group)) is not None)
+            sections = split_sections(content, len(group))
+        except (RuntimeError, ProviderError) as e:
+            # e.g. the packed request is too long for the model, the units are sent one by one
+            print(f"Packed request for stage '{stage}' failed: {e}")
+        if sections is None:
+            print(f"Can't split the packed answer of stage '{stage}', sending {len(group)} units one by one.")
+            sections = [None] * len(group)
+        for index, section in zip(group, sections):
+            # an empty section is fine, e.g. a unit without verbs
+            if section is not None and (not section or validate(section)):
+                results[index] = section
+            else:
+                results[index] = STAGE_FUNCTIONS[stage](texts[index])
+    return results
+
+
+def process_units(texts):
+    """Clean and extraction stages for several units, returns (cleaned, verbs_text, subs_text) per unit."""
+    cleaned = run_stage_packed("clean", texts)
+    verbs = run_stage_packed("verbs", cleaned)
+    subs = run_stage_packed("except_verbs", cleaned)
+    return list(zip(cleaned, verbs, subs))
+
+
+# === Функция classify_and_enrich ===
+def classify_and_enrich(text):
+    """
+    Classifies and enriches the cleaned list in one json request instead of the
+    two free text requests of extract_verbs and extract_except_verbs.
+    Returns (verbs_text, except_verbs_text) in the deck source format.
+    """
+    instruction = """
+You will receive a list of German words, one per line: nouns with their article, verbs in the infinitive and other words (adjectives, adverbs, pronouns, numerals, phrases).
+Classify every item and return a JSON object with exactly these keys:
+
+{
+  "verbs": [{"english": "...", "infinitive": "...", "ich": "...", "du": "...", "er": "...", "wir": "...", "ihr": "...", "sie": "..."}],
+  "nouns": [{"english": "...", "singular": "...", "plural": "..."}],
+  "other": [{"english": "...", "german": "..."}]
+}
+
+Rules:
+1. "verbs": every verb with its English translation and its present tense (Präsens) forms without pronouns. Use separable verb formatting (e.g. "anprobieren" -> "probiere an") and correct irregular forms (e.g. "mögen" -> "mag"). Example: {"english": "to try on", "infinitive": "anprobieren", "ich": "probiere an", "du": "probierst an", "er": "probiert an", "wir": "probieren an", "ihr": "probiert an", "sie": "probieren an"}
+2. "nouns": every word with an article. "singular" is article and singular noun, "plural" is plural article and plural noun, empty if the noun has no plural. Example: {"english": "trousers", "singular": "die Hose", "plural": "die Hosen"}
+3. "other": all remaining words unchanged. Example: {"english": "this", "german": "dieser"}
+4. If a word has multiple common English meanings, separate them with slashes (e.g. "to like/to be fond of").
+5. Keep the order of the input list within each key. Do not use semicolons in any value. Output only the JSON object.
+"""
+
+    messages = [
+        {"role": "system", "content": instruction},
+        {"role": "user", "content": text},
+    ]
+
+    try:
+        content = make_stage_request("classify", messages, response_format={"type": "json_object"})
+    except (RuntimeError, ProviderError) as e:
+        # e.g. groq answers 400 json_validate_failed when the model can't produce valid json,
+        # callers fall back to the free text stages on ValueError
+        raise ValueError(f"Structured request failed: {e}") from e
+    return structured_to_rows(json.loads(content))
+
+
+def structured_to_rows(data):
+    # maps the json answer of classify_and_enrich onto the verb and subs source lines
+    if not isinstance(data, dict):
+        raise ValueError("Structured answer is not a JSON object")
+
+    for key in ("verbs", "nouns", "other"):
+        items = data.get(key) or []
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValueError(f"Structured answer key '{key}' is not a list of objects")
+
+    def clean(value):
+        return str(value or "").replace(";", ",").strip()
+
+    verb_lines = []
+    for verb in data.get("verbs") or []:
+        forms = [verb.get(key) for key in ("english", "infinitive", "ich", "du", "er", "wir", "ihr", "sie")]
+        verb_lines.append(";".join(clean(form) for form in forms))
+
+    subs_lines = []
+    for noun in data.get("nouns") or []:
+        back = clean(noun.get("singular"))
+        if clean(noun.get("plural")):
+            back += f" / {clean(noun.get('plural'))}"
+        subs_lines.append(f"{clean(noun.get('english'))};{back}")
+    for word in data.get("other") or []:
+        subs_lines.append(f"{clean(word.get('english'))};{clean(word.get('german'))}")
+
+    return "\n".join(verb_lines), "\n".join(subs_lines)
+
+
+def validate_rows(cleaned_text, verbs_text, except_verbs_text):
+    """
+    Checks the answers of the llm stages against the cleaned input list.
+    Returns (verb_rows, subs_rows, missing_items, malformed): duplicated words
+    are kept once, every input item that no valid row covers is reported as
+    missing and malformed holds the (verb_lines, subs_lines) that didn't parse
+    and whose words no valid row covers.
+    """
+    verb_rows, invalid_verbs = parse_rows(verbs_text, len(VERB_FIELDS))
+    subs_rows, invalid_subs = parse_rows(except_verbs_text, len(SUBS_FIELDS))
+
+    covered = set()
+    unique_verbs = []
+    for row in verb_rows:
+        key = german_key(row[1])
+        if key not in covered:
+            covered.add(key)
+            unique_verbs.append(row)
+    unique_subs = []
+    for row in subs_rows:
+        key = german_key(row[1])
+        if key not in covered:
+            covered.add(key)
+            unique_subs.append(row)
+
+    def still_broken(line):
+        # a malformed line is replaced once a valid row covers one of its words
+        return not any(german_key(field) in covered for field in split_row(line) if field.strip())
+
+    malformed = ([line for line in invalid_verbs if still_broken(line)],
+                 [line for line in invalid_subs if still_broken(line)])
+
+    missing = []
+    for item in cleaned_text.splitlines():
+        item = item.strip()
+        if item and german_key(item) not in covered and item not in missing:
+            missing.append(item)
+    return unique_verbs, unique_subs, missing, malformed
+
+
+def repair_rows(cleaned_text, verbs_text, except_verbs_text):
+    """
+    Validation pass after the llm stages. Only the items that are missing or
+    came back malformed are sent again, in one small structured request, and
+    merged with the rows that were already valid. While items are still
+    missing, the malformed lines are kept at the end so the editor highlights
+    them. Once every item is covered they are dropped.
+    Returns (verbs_text, except_verbs_text).
+    """
+    verb_rows, subs_rows, missing, malformed = validate_rows(cleaned_text, verbs_text, except_verbs_text)
+    max_items = get_config_section("llm")["max_repair_items"]
+    if missing and len(missing) <= max_items:
+        print(f"Re-asking {len(missing)} missing or malformed items: {missing}")
+        try:
+            extra_verbs, extra_subs = classify_and_enrich("\n".join(missing))
+        except (ValueError, RuntimeError) as e:
+            print(f"Repair request failed: {e}")
+        else:
+            verb_rows, subs_rows, still_missing, malformed = validate_rows(
+                cleaned_text,
+                "\n".join([rows_to_text(verb_rows), extra_verbs] + malformed[0]),
+                "\n".join([rows_to_text(subs_rows), extra_subs] + malformed[1]),
+            )
+            if still_missing:
+                print(f"Items still missing after repair: {still_missing}")
+            missing = still_missing
+    elif missing:
+        print(f"{len(missing)} items missing, too many for a targeted repair: {missing}")
+    if not missing:
+        # every item has a valid row, e.g. "the tree" was repaired to "the tree;der Baum"
+        malformed = ([], [])
+    return ("\n".join([rows_to_text(verb_rows)] + malformed[0]).strip("\n"),
+            "\n".join([rows_to_text(subs_rows)] + malformed[1]).strip("\n"))
\ No newline at end of file
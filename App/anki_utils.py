@@ -1,184 +1,23 @@
 import genanki
 import random
 import os
-from gtts import gTTS
+from gtts import gTTS, gTTSError
+import requests
 import base64
 import io
-
-def create_s_deck(label):
-
-    MODEL_ID = random.randint(1, 10000)
-    DECK_ID = random.randint(1, 10000)
-
-    deck_name = f"Unit {label} Substantiv"
-
-    CSS_STYLE = """
-        .card {
-          font-family: Arial, sans-serif;
-          font-size: 24px;
-          text-align: center;
-          color: #2e2e2e;
-          background-color: #f9f9f9;
-          padding: 20px;
-          border-radius: 10px;
-          box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        }
-
-        .input-box {
-          margin-top: 20px;
-          padding: 10px;
-          font-size: 20px;
-          width: 80%;
-          max-width: 300px;
-          border: 2px solid #ccc;
-          border-radius: 5px;
-        }
-
-        .check-btn {
-          margin-top: 15px;
-          padding: 10px 20px;
-          font-size: 18px;
-          cursor: pointer;
-          background-color: #4CAF50;
-          color: white;
-          border: none;
-          border-radius: 5px;
-        }
-
-        .audio-btn {
-          margin-top: 10px;
-          padding: 8px 16px;
-          font-size: 16px;
-          background-color: #2196F3;
-          color: white;
-          border: none;
-          border-radius: 5px;
-          cursor: pointer;
-        }
-        """
-
-    HTML_QUESTION = """
-        <div class="card">
-          <div>{{Front}}</div>
-          <input type="text" id="user_input" class="input-box" placeholder="Input translation">
-          <br>
-          <button class="check-btn" onclick="checkAnswer()">Check</button>
-        </div>
-
-        <script>
-        function checkAnswer() {
-          const userInput = document.getElementById('user_input').value.trim();
-          const correctAnswer = "{{Back}}".trim();
-
-          if (!userInput) {
-            alert("Input translation!");
-            return;
-          }
-
-          const inputBox = document.getElementById('user_input');
-          if (userInput.toLowerCase() === correctAnswer.toLowerCase()) {
-            inputBox.style.backgroundColor = '#baffc9'; // red
-          } else {
-            inputBox.style.backgroundColor = '#ffb3b3'; // green
-          }
-        }
-        </script>
-        """
-
-    HTML_ANSWER = """
-        {{FrontSide}}
-        <hr>
-        <div class="card">
-          <div>Correct translation:</div>
-          <div style="margin-top: 10px; font-weight: bold;">{{Back}}</div>
-          <button class="audio-btn" onclick="playAudio()">🔊 Play</button>
-          <audio id="back_audio"></audio>
-        </div>
-
-        <script>
-        function playAudio() {
-          const audioElement = document.getElementById('back_audio');
-          if (!audioElement.src) {
-            audioElement.src = "{{Audio_Back}}";
-          }
-          audioElement.play().catch(e => console.error("Play error:", e));
-        }
-        </script>
-        """
-
-    model = genanki.Model(
-        model_id=MODEL_ID,
-        name='Interactive Input Card with Audio',
-        fields=[
-            {'name': 'Front'},
-            {'name': 'Back'},
-            {'name': 'Audio_Back'},
-        ],
-        templates=[{
-            'name': 'Card',
-            'qfmt': HTML_QUESTION,
-            'afmt': HTML_ANSWER,
-        }],
-        css=CSS_STYLE)
-
-    deck = genanki.Deck(deck_id=DECK_ID, name=deck_name)
-    word_pairs = []
-
-    filename = f"C:/Users/GANT-NB/Music/anki/sources/subs {label}.txt"
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            for line in file.read().splitlines():
-                if line.strip():
-                    arr = line.split(";")
-                    if len(arr) == 2:
-                        word_pairs.append(arr)
-    except FileNotFoundError:
-        print(f"Can't find file: {filename}!")
-        return
-
-    random.shuffle(word_pairs)
-
-    for front, back in word_pairs:
-        try:
-            # Создаём TTS объект
-            tts = gTTS(text=back, lang='de', slow=False)
-
-            # Сохраняем в BytesIO (в памяти)
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)  # <-- Вот правильный способ!
-            fp.seek(0)
-
-            # Читаем байты и кодируем в Base64
-            audio_bytes = fp.read()
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            audio_field = f"data:audio/mpeg;base64,{audio_base64}"
-        except Exception as e:
-            print(f"Error while generating audio for '{back}': {e}")
-            audio_field = ""
-
-        note = genanki.Note(
-            model=model,
-            fields=[front.strip(), back.strip(), audio_field]
-        )
-        deck.add_note(note)
-
-    # Экспорт колоды
-    package = genanki.Package(deck)
-    path = f'C:/Users/GANT-NB/Music/anki/packages/en_to_deu_subs_{label}.apkg'
-
-    if os.path.exists(path):
-        os.remove(path)
-
-    package.write_to_file(path)
-    print(f'Successfully created deck at the path: {path}')
-
-def create_v_deck(label):
-    MODEL_ID = random.randint(1, 10000)
-    DECK_ID = random.randint(1, 10000)
-
-    deck_name = f"Unit {label} Verb"
-
-    CSS_STYLE = """
+import threading
+import hashlib
+import re
+import tempfile
+import json
+from concurrent.futures import ThreadPoolExecutor
+from app_config import get_config_section
+from usage_ledger import record_timeout
+from mp3_utils import join_clips
+from row_utils import VERB_FIELDS, SUBS_FIELDS, parse_rows, iter_rows, german_key
+from collections import deque, Counter, OrderedDict
+
+CSS_STYLE = """
     .card {
       font-family: Arial, sans-serif;
       font-size: 24px;
@@ -212,7 +51,7 @@ def create_v_deck(label):
     }
 
     .audio-btn {
-      margin-top: 15px;
+      margin-top: 10px;
       padding: 8px 16px;
       font-size: 16px;
       background-color: #2196F3;
@@ -223,7 +62,7 @@ def create_v_deck(label):
     }
     """
 
-    HTML_QUESTION = """
+HTML_QUESTION = """
     <div class="card">
       <div>{{Front}}</div>
       <input type="text" id="user_input" class="input-box" placeholder="Input translation">
@@ -243,15 +82,43 @@ def create_v_deck(label):
 
       const inputBox = document.getElementById('user_input');
       if (userInput.toLowerCase() === correctAnswer.toLowerCase()) {
-        inputBox.style.backgroundColor = '#baffc9'; // red
+        inputBox.style.backgroundColor = '#baffc9'; // green
       } else {
-        inputBox.style.backgroundColor = '#ffb3b3'; // green
+        inputBox.style.backgroundColor = '#ffb3b3'; // red
+      }
+    }
+    </script>
+    """
+
+# Audio_Back holds a data uri (single packages) or an <audio> tag of a media file, the tag
+# lets Anki's "Check Media" see that the clip is used
+HTML_AUDIO_SCRIPT = """
+    <div id="audio_source" style="display: none;">{{Audio_Back}}</div>
+    <script>
+    function playAudio() {
+      const audioElement = document.getElementById('back_audio');
+      if (!audioElement.src) {
+        const source = document.getElementById('audio_source');
+        const tag = source.querySelector('audio');
+        audioElement.src = tag ? tag.getAttribute('src') : source.textContent.trim();
       }
+      audioElement.play().catch(e => console.error("Play error:", e));
     }
     </script>
     """
 
-    HTML_ANSWER = """
+HTML_SUBS_ANSWER = """
+    {{FrontSide}}
+    <hr>
+    <div class="card">
+      <div>Correct translation:</div>
+      <div style="margin-top: 10px; font-weight: bold;">{{Back}}</div>
+      <button class="audio-btn" onclick="playAudio()">🔊 Play</button>
+      <audio id="back_audio"></audio>
+    </div>
+    """ + HTML_AUDIO_SCRIPT
+
+HTML_VERB_ANSWER = """
     {{FrontSide}}
     <hr>
     <div class="card">
@@ -264,86 +131,672 @@ def create_v_deck(label):
       <button class="audio-btn" onclick="playAudio()">🔊 Play</button>
       <audio id="back_audio"></audio>
     </div>
+    """ + HTML_AUDIO_SCRIPT
+
+# everything that differs between the two card types
+CARD_TYPES = {
+    "subs": {
+        "deck_name": "Unit {label} Substantiv",
+        "subdeck_name": "Substantiv",
+        # fixed ids so every package shares the same note types
+        "model_id": 1754301001,
+        "model_name": "Interactive Input Card with Audio",
+        "fields": SUBS_FIELDS,
+        "answer": HTML_SUBS_ANSWER,
+        "source_name": "subs {label}.txt",
+        "package_name": "en_to_deu_subs_{label}.apkg",
+        # text spoken on the back of the card
+        "audio_text": lambda row: row[1],
+    },
+    "verbs": {
+        "deck_name": "Unit {label} Verb",
+        "subdeck_name": "Verb",
+        "model_id": 1754301002,
+        "model_name": "Interactive Verb Card with Audio",
+        "fields": VERB_FIELDS,
+        "answer": HTML_VERB_ANSWER,
+        "source_name": "verbs {label}.txt",
+        "package_name": "en_to_deu_verbs_{label}.apkg",
+        "audio_text": lambda row: " ; ".join(row[1:]),
+        # with tts.segment_verbs every form is spoken and cached on its own
+        "audio_segments": lambda row: row[1:],
+    },
+}
+
+
+def template_version():
+    # changes whenever the card templates or note types change, so packages get rebuilt
+    parts = [CSS_STYLE, HTML_QUESTION, HTML_SUBS_ANSWER, HTML_VERB_ANSWER]
+    for kind in sorted(CARD_TYPES):
+        card_type = CARD_TYPES[kind]
+        parts += [str(card_type["model_id"]), card_type["model_name"], card_type["deck_name"]]
+        parts += card_type["fields"]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class SegmentedClip:
+    """
+    Future-like clip made of separately synthesized segments, joined with a
+    short silence once every segment is done.
+    """
 
-    <script>
-    function playAudio() {
-      const audioElement = document.getElementById('back_audio');
-      if (!audioElement.src) {
-        audioElement.src = "data:audio/mpeg;base64,{{Audio_Back}}";
-      }
-      audioElement.play().catch(e => console.error("Error playing:", e));
-    }
-    </script>
+    def __init__(self, futures, silence_ms):
+        self.futures = futures
+        self.silence_ms = silence_ms
+
+    def result(self, timeout=None):
+        return join_clips([future.result(timeout=timeout) for future in self.futures], self.silence_ms)
+
+
+class AudioSynthesizer:
+    """
+    Thread pool for gTTS requests shared by all decks of a build. Identical texts
+    are synthesized once, later requests get the same future.
+    """
+
+    def __init__(self, workers=None, cache=True, max_cached=None):
+        options = get_config_section("tts")
+        if workers is None:
+            workers = options["workers"]
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # the streaming builder turns the cache off, cached futures would keep every clip in memory
+        self.use_cache = cache
+        # a long-lived synthesizer (build service) keeps only the most recently used clips
+        self.max_cached = max_cached
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.segment_verbs = options["segment_verbs"]
+        self.silence_ms = options["segment_silence_ms"]
+        self.segment_cache_dir = options["segment_cache_dir"]
+        self.requests = 0
+        self.hits = 0
+
+    def synthesize(self, text):
+        # every request has a deadline, a stalled or failed request is sent again
+        deadlines = get_config_section("deadlines")
+        for attempt in range(deadlines["tts_retries"] + 1):
+            tts = gTTS(text=text, lang='de', slow=False, timeout=deadlines["tts_seconds"] or None)
+            fp = io.BytesIO()
+            try:
+                tts.write_to_fp(fp)
+                return fp.getvalue()
+            except gTTSError as e:
+                if isinstance(e.__context__, requests.exceptions.Timeout):
+                    record_timeout("gtts", "tts")
+                if attempt == deadlines["tts_retries"]:
+                    raise
+                print(f"TTS request for '{text}' failed, retrying: {e}")
+
+    def synthesize_segment(self, text):
+        # segments are kept on disk as well, so other units and later builds reuse them
+        if not self.segment_cache_dir:
+            return self.synthesize(text)
+        path = os.path.join(self.segment_cache_dir, hashlib.sha1(text.encode("utf-8")).hexdigest() + ".mp3")
+        if os.path.exists(path):
+            with self.lock:
+                self.hits += 1
+            with open(path, "rb") as f:
+                return f.read()
+        data = self.synthesize(text)
+        os.makedirs(self.segment_cache_dir, exist_ok=True)
+        # unique per process and thread, build_all writes the same cache from several processes
+        fd, tmp_path = tempfile.mkstemp(dir=self.segment_cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+    def submit(self, text, synthesize=None):
+        synthesize = synthesize or self.synthesize
+        with self.lock:
+            self.requests += 1
+            if not self.use_cache:
+                return self.executor.submit(synthesize, text)
+            future = self.cache.get(text)
+            if future is None:
+                future = self.executor.submit(synthesize, text)
+                self.cache[text] = future
+                if self.max_cached and len(self.cache) > self.max_cached:
+                    self.cache.popitem(last=False)
+            else:
+                self.cache.move_to_end(text)
+                self.hits += 1
+            return future
+
+    def submit_row(self, card_type, row):
+        # audio of a note, verb forms are shared by many verbs and units when spoken one by one
+        segments = card_type.get("audio_segments")
+        if self.segment_verbs and segments is not None:
+            # without the memory cache (streaming builds) segments are reused through the disk cache only
+            futures = [self.submit(text, synthesize=self.synthesize_segment) for text in segments(row)]
+            return SegmentedClip(futures, self.silence_ms)
+        return self.submit(card_type["audio_text"](row))
+
+    def audio_field(self, future, text):
+        # waits for the clip and turns it into a data uri, an empty field if tts failed
+        try:
+            audio_bytes = future.result()
+        except Exception as e:
+            print(f"Error while generating audio for '{text}': {e}")
+            return ""
+        return "data:audio/mpeg;base64," + base64.b64encode(audio_bytes).decode('utf-8')
+
+    def media_field(self, future, text, media):
+        # stores the clip in the media store and returns an audio tag that references it
+        try:
+            audio_bytes = future.result()
+        except Exception as e:
+            print(f"Error while generating audio for '{text}': {e}")
+            return ""
+        return audio_tag(media.add(audio_bytes))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.hits:
+            print(f"TTS cache: {self.hits} of {self.requests} clips reused ({self.hits / self.requests:.0%}).")
+
+
+def audio_tag(filename):
+    return f'<audio src="{filename}"></audio>'
+
+
+def media_filename(field):
+    # file name referenced by an Audio_Back field, "" for a data uri or an empty field
+    match = re.search(r'<audio src="([^"]+)"', field)
+    return match.group(1) if match else ""
+
+
+class MediaStore:
+    """
+    Audio files of a package, named by the hash of their content so identical
+    clips from different units end up as one media file.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def add(self, data):
+        filename = hashlib.sha1(data).hexdigest() + ".mp3"
+        with self.lock:
+            if filename not in self.files:
+                path = os.path.join(self.directory, filename)
+                with open(path, "wb") as f:
+                    f.write(data)
+                self.files[filename] = path
+        return filename
+
+    def paths(self):
+        return list(self.files.values())
+
+
+def stable_id(name):
+    # deck ids derived from the deck name, so re-imports update the same deck
+    return int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def note_guid(kind, label, row, occurrence=0):
+    # guid from the card type, the unit and the german word, a corrected translation or form updates the same note
+    if occurrence:
+        return genanki.guid_for(kind, label, german_key(row[1]), occurrence)
+    return genanki.guid_for(kind, label, german_key(row[1]))
+
+
+class NoteGuids:
+    """
+    Hands out the guids of one unit in source order. A word that occurs again,
+    e.g. the homonyms "die Bank" (bench) and "die Bank" (bank), gets a numbered
+    guid instead of overwriting the first note on import.
     """
 
-    # Модель с новым полем Audio_Back
-    model = genanki.Model(
-        model_id=MODEL_ID,
-        name='Interactive Verb Card with Audio',
-        fields=[
-            {'name': 'Front'},
-            {'name': 'Back'},
-            {'name': 'ich'},
-            {'name': 'du'},
-            {'name': 'er'},
-            {'name': 'wir'},
-            {'name': 'ihr'},
-            {'name': 'sie'},
-            {'name': 'Audio_Back'},  # Поле для Base64-аудио
-        ],
+    def __init__(self, kind, label):
+        self.kind = kind
+        self.label = label
+        self.seen = Counter()
+
+    def __call__(self, row):
+        key = german_key(row[1])
+        occurrence = self.seen[key]
+        self.seen[key] += 1
+        return note_guid(self.kind, self.label, row, occurrence)
+
+
+def create_model(kind):
+    card_type = CARD_TYPES[kind]
+    return genanki.Model(
+        model_id=card_type["model_id"],
+        name=card_type["model_name"],
+        fields=[{'name': name} for name in card_type["fields"]] + [{'name': 'Audio_Back'}],
         templates=[{
             'name': 'Card',
             'qfmt': HTML_QUESTION,
-            'afmt': HTML_ANSWER,
+            'afmt': card_type["answer"],
         }],
         css=CSS_STYLE)
 
-    deck = genanki.Deck(deck_id=DECK_ID, name=deck_name)
-    word_pairs = []
 
-    filename = f"C:/Users/GANT-NB/Music/anki/sources/verbs {label}.txt"
+def build_deck(kind, label, rows, synthesizer, deck_name=None, media=None):
+    """
+    Builds a genanki deck from in-memory rows, all audio is requested before the
+    first wait. Without a media store the audio is embedded as a data uri.
+    """
+    card_type = CARD_TYPES[kind]
+    model = create_model(kind)
+    if deck_name is None:
+        deck_name = card_type["deck_name"].format(label=label)
+    deck = genanki.Deck(deck_id=stable_id(deck_name), name=deck_name)
 
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            for line in file.read().splitlines():
-                if line.strip():
-                    arr = line.split(";")
-                    if len(arr) == 8:
-                        word_pairs.append(arr)
-                    else:
-                        print(f"Incorrect structure: {line}")
-    except FileNotFoundError:
-        print(f"Can't find file: {filename}")
-        return
+    # guids are handed out in source order, before the shuffle
+    guids = NoteGuids(kind, label)
+    rows = [(row, guids(row)) for row in rows]
+    random.shuffle(rows)
 
-    random.shuffle(word_pairs)
+    texts = [card_type["audio_text"](row) for row, _ in rows]
+    futures = [synthesizer.submit_row(card_type, row) for row, _ in rows]
 
-    for row in word_pairs:
-        back = " ; ".join(row[1:])
+    for (row, guid), text, future in zip(rows, texts, futures):
+        if media is None:
+            audio = synthesizer.audio_field(future, text)
+        else:
+            audio = synthesizer.media_field(future, text, media)
+        fields = [field.strip() for field in row] + [audio]
+        deck.add_note(genanki.Note(model=model, fields=fields, guid=guid))
+    return deck
 
-        # Audio generation
-        try:
-            tts = gTTS(text=back, lang='de', slow=False)
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)
-            fp.seek(0)
-            audio_bytes = fp.read()
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-        except Exception as e:
-            print(f"Error while generating audio '{back}': {e}")
-            audio_base64 = ""
 
-        # Adding the audio field
-        fields = row + [audio_base64]
+def package_path(kind, label, packages_dir=None):
+    packages_dir = packages_dir or get_config_section("paths")["packages_dir"]
+    return os.path.join(packages_dir, CARD_TYPES[kind]["package_name"].format(label=label))
 
-        note = genanki.Note(model=model, fields=fields)
-        deck.add_note(note)
 
+def write_package(deck, path):
     package = genanki.Package(deck)
-    path = f'C:/Users/GANT-NB/Music/anki/packages/en_to_deu_verbs_{label}.apkg'
 
     if os.path.exists(path):
         os.remove(path)
 
     package.write_to_file(path)
-    print(f'Successfully created deck at the path: {path}')
\ No newline at end of file
+    print(f'Successfully created deck at the path: {path}')
+
+
+def tsv_path(kind, label):
+    # next to the package: en_to_deu_subs_13.apkg -> en_to_deu_subs_13.txt
+    return os.path.splitext(package_path(kind, label))[0] + ".txt"
+
+
+def tsv_field(value):
+    # tabs would split the field. a line starting with "#" is a comment for anki, such a field is quoted
+    value = value.replace("\t", " ").strip()
+    if value.startswith("#") or value.startswith('"'):
+        value = '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def write_tsv(kind, label, rows, path=None):
+    """
+    Writes rows as a tab separated file for Anki's own text importer, without
+    audio. The guid column matches the guids of the full build, so importing
+    the .apkg later updates these notes and adds the audio. The guid goes last,
+    a base91 guid can start with "#".
+    The note type is matched by name: a note type of the same name with another
+    id, e.g. from builds before the fixed model ids, has to be renamed first.
+    """
+    card_type = CARD_TYPES[kind]
+    path = path or tsv_path(kind, label)
+    header = [
+        "#separator:tab",
+        "#html:false",
+        f"#notetype:{card_type['model_name']}",
+        f"#deck:{card_type['deck_name'].format(label=label)}",
+        f"#guid column:{len(card_type['fields']) + 1}",
+        "#columns:" + "\t".join(card_type["fields"]) + "\tGUID",
+    ]
+    guids = NoteGuids(kind, label)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(header) + "\n")
+        for row in rows:
+            fields = [tsv_field(field) for field in row] + [tsv_field(guids(row))]
+            f.write("\t".join(fields) + "\n")
+    print(f'Successfully exported {len(rows)} notes to: {path}')
+    return path
+
+
+def export_tsv(label, verb_rows, subs_rows):
+    # fast text-only export of a unit, returns the written paths
+    return [write_tsv(kind, label, rows) for kind, rows in (("verbs", verb_rows), ("subs", subs_rows)) if rows]
+
+
+def build_decks(label, verb_rows, subs_rows, status=None, packages_dir=None, synthesizer=None):
+    """
+    Builds the verb and noun decks of one unit at the same time, sharing one tts
+    pool and cache, and writes both packages in parallel. Returns the written paths.
+    packages_dir overrides the configured directory and synthesizer the tts pool,
+    e.g. for a build service job. A passed synthesizer is left open.
+    """
+    jobs = [(kind, rows) for kind, rows in (("verbs", verb_rows), ("subs", subs_rows)) if rows]
+    own_synthesizer = synthesizer is None
+    if own_synthesizer:
+        synthesizer = AudioSynthesizer()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as executor:
+            decks = list(executor.map(lambda job: build_deck(job[0], label, job[1], synthesizer), jobs))
+            if status:
+                status("Writing packages...")
+            paths = [package_path(kind, label, packages_dir) for kind, _ in jobs]
+            list(executor.map(write_package, decks, paths))
+        if packages_dir is None:
+            # delta packages are built against the configured directory only
+            for (kind, _), deck in zip(jobs, decks):
+                record_notes(kind, label, deck.notes)
+    finally:
+        if own_synthesizer:
+            synthesizer.close()
+    return paths
+
+
+def build_bulk_package(units, path, status=None):
+    """
+    Packages many units into one .apkg with a subdeck per unit and card type
+    (e.g. German::Unit 13::Verb). units is a list of (label, verb_rows, subs_rows).
+    Note types are shared and audio is stored once per distinct clip.
+    """
+    deck_template = get_config_section("bulk")["deck_name"]
+    synthesizer = AudioSynthesizer()
+    try:
+        with tempfile.TemporaryDirectory() as media_dir:
+            media = MediaStore(media_dir)
+            jobs = []
+            for label, verb_rows, subs_rows in units:
+                for kind, rows in (("verbs", verb_rows), ("subs", subs_rows)):
+                    if rows:
+                        deck_name = deck_template.format(label=label, card_type=CARD_TYPES[kind]["subdeck_name"])
+                        jobs.append((kind, label, rows, deck_name))
+
+            with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), 4))) as executor:
+                decks = list(executor.map(
+                    lambda job: build_deck(job[0], job[1], job[2], synthesizer, deck_name=job[3], media=media),
+                    jobs))
+
+            if status:
+                status("Writing package...")
+            package = genanki.Package(decks, media_files=media.paths())
+            if os.path.exists(path):
+                os.remove(path)
+            package.write_to_file(path)
+            print(f'Successfully created {len(decks)} decks with {len(media.files)} media files at the path: {path}')
+    finally:
+        synthesizer.close()
+    return path
+
+
+def find_source_labels():
+    # labels of all units that have a subs or verbs source file
+    sources_dir = get_config_section("paths")["sources_dir"]
+    labels = set()
+    if not os.path.isdir(sources_dir):
+        return []
+    for filename in os.listdir(sources_dir):
+        match = re.fullmatch(r"(?:subs|verbs) (.+)\.txt", filename)
+        if match:
+            labels.add(match.group(1))
+    return sorted(labels)
+
+
+def export_units(labels, path, status=None):
+    # bulk export of units read from the sources directory
+    units = []
+    for label in labels:
+        verb_rows = read_source_rows("verbs", label) or []
+        subs_rows = read_source_rows("subs", label) or []
+        if verb_rows or subs_rows:
+            units.append((label, verb_rows, subs_rows))
+    if not units:
+        print("No units to export.")
+        return None
+    return build_bulk_package(units, path, status=status)
+
+
+def read_source_rows(kind, label):
+    # reads and parses the source file of a unit, None if it doesn't exist
+    filename = source_path(kind, label)
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            rows, invalid = parse_rows(file.read(), len(CARD_TYPES[kind]["fields"]))
+    except FileNotFoundError:
+        print(f"Can't find file: {filename}!")
+        return None
+    for line in invalid:
+        print(f"Incorrect structure: {line}")
+    return rows
+
+
+class DeckStream:
+    """
+    Adds notes to a deck one row at a time with a bounded number of clips in
+    flight. Every clip goes straight into the media store and only its file
+    name stays in memory. Repeated texts are synthesized once.
+    """
+
+    def __init__(self, kind, label, synthesizer, media, deck_name=None):
+        self.kind = kind
+        self.card_type = CARD_TYPES[kind]
+        self.model = create_model(kind)
+        if deck_name is None:
+            deck_name = self.card_type["deck_name"].format(label=label)
+        self.deck = genanki.Deck(deck_id=stable_id(deck_name), name=deck_name)
+        self.guids = NoteGuids(kind, label)
+        self.synthesizer = synthesizer
+        self.media = media
+        self.max_in_flight = synthesizer.workers * get_config_section("build")["streaming_window"]
+        # audio text -> media file name
+        self.done = {}
+        self.pending = deque()
+        self.in_flight = set()
+
+    def add(self, row):
+        text = self.card_type["audio_text"](row)
+        future = None
+        if text not in self.done and text not in self.in_flight:
+            future = self.synthesizer.submit_row(self.card_type, row)
+            self.in_flight.add(text)
+        self.pending.append((row, self.guids(row), text, future))
+        if len(self.pending) >= self.max_in_flight:
+            self.finish_oldest()
+
+    def finish_oldest(self):
+        row, guid, text, future = self.pending.popleft()
+        if future is not None:
+            self.done[text] = self.synthesizer.media_field(future, text, self.media)
+            self.in_flight.discard(text)
+        self.deck.add_note(genanki.Note(model=self.model, fields=row + [self.done[text]], guid=guid))
+
+    def finish(self):
+        while self.pending:
+            self.finish_oldest()
+        return self.deck
+
+
+def write_media_package(decks, media_paths, path):
+    package = genanki.Package(decks, media_files=media_paths)
+    if os.path.exists(path):
+        os.remove(path)
+    # genanki copies the media files from disk into the archive one by one
+    package.write_to_file(path)
+    print(f'Successfully created deck at the path: {path}')
+
+
+def build_deck_streaming(kind, source_path, label, path):
+    """
+    Out-of-core variant of build_deck for very large source files. Rows are read
+    lazily and go through a DeckStream, so memory stays bounded by the number
+    of clips in flight. Rows keep their file order, Anki can randomize new cards instead.
+    """
+    field_count = len(CARD_TYPES[kind]["fields"])
+    # cached futures would keep every clip in memory, DeckStream dedupes by file name instead
+    synthesizer = AudioSynthesizer(cache=False)
+    try:
+        with tempfile.TemporaryDirectory() as media_dir:
+            media = MediaStore(media_dir)
+            stream = DeckStream(kind, label, synthesizer, media)
+            with open(source_path, 'r', encoding='utf-8') as file:
+                for row, error in iter_rows(file, field_count):
+                    if error:
+                        print(f"Incorrect structure: {';'.join(row)}")
+                        continue
+                    stream.add(row)
+            deck = stream.finish()
+            if not deck.notes:
+                print(f"No valid rows in {source_path}, no package written.")
+                return None
+            write_media_package(deck, media.paths(), path)
+            record_notes(kind, label, deck.notes)
+    finally:
+        synthesizer.close()
+    return path
+
+
+# --- note manifests and delta packages ---
+def note_manifest_path(kind, label):
+    # one file per unit and card type, so parallel builds never write the same manifest
+    notes_dir = os.path.join(get_config_section("paths")["packages_dir"], "notes")
+    return os.path.join(notes_dir, f"{kind} {label}.json")
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def note_entry(kind, fields):
+    # [hash of the row, hash of the spoken text, media file name or "" for an embedded clip]
+    row, audio = fields[:-1], fields[-1]
+    return [text_hash(";".join(row)), text_hash(CARD_TYPES[kind]["audio_text"](row)), media_filename(audio)]
+
+
+def load_note_manifest(kind, label):
+    # notes of the last build, None if there was none or the templates changed since
+    path = note_manifest_path(kind, label)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except json.JSONDecodeError:
+        print(f"Error: Invalid JSON format in note manifest {path}.")
+        return None
+    if manifest.get("templates") != template_version():
+        return None
+    return manifest
+
+
+def save_note_manifest(kind, label, notes):
+    path = note_manifest_path(kind, label)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"templates": template_version(), "notes": notes}, f)
+    os.replace(tmp_path, path)
+
+
+def record_notes(kind, label, notes):
+    # remembers what a full build of the unit contained, delta packages are built against it
+    save_note_manifest(kind, label, {note.guid: note_entry(kind, note.fields) for note in notes})
+
+
+def delta_package_path(kind, label):
+    base, extension = os.path.splitext(package_path(kind, label))
+    return f"{base}_delta{extension}"
+
+
+def build_delta_package(kind, label, path=None):
+    """
+    Builds a package with only the notes that were added or changed since the
+    last build of the unit. Changed notes keep their guid, so Anki updates them
+    on import, and clips whose text didn't change are referenced by name instead
+    of being shipped again. Returns the path, or None if there is no previous
+    build to compare with or nothing changed.
+    """
+    previous = load_note_manifest(kind, label)
+    if previous is None:
+        return None
+    rows = read_source_rows(kind, label)
+    if rows is None:
+        return None
+    path = path or delta_package_path(kind, label)
+    card_type = CARD_TYPES[kind]
+    old_notes = previous["notes"]
+
+    notes = {}
+    changed = []
+    guids = NoteGuids(kind, label)
+    for row in rows:
+        guid = guids(row)
+        entry = old_notes.get(guid)
+        if entry is not None and entry[0] == text_hash(";".join(row)):
+            notes[guid] = entry
+        else:
+            changed.append((guid, row, entry))
+    removed = set(old_notes) - set(notes) - {guid for guid, _, _ in changed}
+    if removed:
+        print(f"{len(removed)} notes were removed from the source, delete them in Anki by hand.")
+    if not changed:
+        print(f"No changed notes in {kind} {label}.")
+        save_note_manifest(kind, label, notes)
+        return None
+
+    model = create_model(kind)
+    deck_name = card_type["deck_name"].format(label=label)
+    deck = genanki.Deck(deck_id=stable_id(deck_name), name=deck_name)
+    synthesizer = AudioSynthesizer()
+    try:
+        with tempfile.TemporaryDirectory() as media_dir:
+            media = MediaStore(media_dir)
+            jobs = []
+            for guid, row, entry in changed:
+                text = card_type["audio_text"](row)
+                if entry is not None and entry[1] == text_hash(text) and entry[2]:
+                    # the clip is already in the collection from the last import
+                    jobs.append((guid, row, text, audio_tag(entry[2])))
+                else:
+                    jobs.append((guid, row, text, synthesizer.submit_row(card_type, row)))
+            for guid, row, text, audio in jobs:
+                if not isinstance(audio, str):
+                    audio = synthesizer.media_field(audio, text, media)
+                fields = [field.strip() for field in row] + [audio]
+                deck.add_note(genanki.Note(model=model, fields=fields, guid=guid))
+                notes[guid] = note_entry(kind, fields)
+            write_media_package(deck, media.paths(), path)
+    finally:
+        synthesizer.close()
+    save_note_manifest(kind, label, notes)
+    print(f"Delta package with {len(changed)} of {len(rows)} notes and {len(media.files)} new clips.")
+    return path
+
+
+def source_path(kind, label, sources_dir=None):
+    sources_dir = sources_dir or get_config_section("paths")["sources_dir"]
+    return os.path.join(sources_dir, CARD_TYPES[kind]["source_name"].format(label=label))
+
+
+def create_deck_from_source(kind, label):
+    # builds one deck from its source file, large files go through the streaming builder
+    filename = source_path(kind, label)
+    if not os.path.exists(filename):
+        print(f"Can't find file: {filename}!")
+        return None
+    if os.path.getsize(filename) >= get_config_section("build")["streaming_threshold_bytes"]:
+        path = build_deck_streaming(kind, filename, label, package_path(kind, label))
+        return [path] if path else []
+    rows = read_source_rows(kind, label)
+    if kind == "verbs":
+        return build_decks(label, rows, [])
+    return build_decks(label, [], rows)
+
+
+def create_s_deck(label):
+    return create_deck_from_source("subs", label)
+
+
+def create_v_deck(label):
+    return create_deck_from_source("verbs", label)
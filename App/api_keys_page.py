@@ -7,6 +7,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from custom_dialog import ApiKeyDialog, ConfirmationDialog
 from api_data import load_api_keys, save_api_keys
+from usage_ledger import (get_usage, format_usage, get_timeout_stats, format_timeout_stats, get_model_stats,
+                          format_model_stats)
 from PyQt5.QtGui import QIcon
 
 class ApiKeysPage(QWidget):
@@ -50,11 +52,17 @@ class ApiKeysPage(QWidget):
 
         # Table for displaying API keys
         self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["NAME", "SECRET KEY", "", ""])
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["NAME", "SECRET KEY", "USAGE TODAY", "", ""])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.table)
 
+        # timeouts of all keys and services (ocr engines, gtts) today and the answers of the stage models
+        self.stats_label = QLabel()
+        self.stats_label.setStyleSheet("color: #aaaaaa;")
+        self.stats_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.stats_label)
+
     def load_keys(self):
         # load and display API keys
         self.api_keys = load_api_keys()
@@ -66,6 +74,10 @@ class ApiKeysPage(QWidget):
             # display masked key
             masked_key = self.mask_key(key_data["key"])
             self.table.setItem(row, 1, QTableWidgetItem(masked_key))
+            # usage summary from the local ledger
+            usage_item = QTableWidgetItem(format_usage(get_usage(key_data["name"])))
+            usage_item.setFlags(usage_item.flags() & ~Qt.ItemIsEditable)
+            self.table.setItem(row, 2, usage_item)
 
             edit_btn = QPushButton("Edit")
             delete_btn = QPushButton("Delete")
@@ -96,8 +108,15 @@ class ApiKeysPage(QWidget):
             edit_btn.clicked.connect(lambda _, r=row: self.show_edit_dialog(r))
             delete_btn.clicked.connect(lambda _, r=row: self.delete_key(r))
 
-            self.table.setCellWidget(row, 2, edit_btn)
-            self.table.setCellWidget(row, 3, delete_btn)
+            self.table.setCellWidget(row, 3, edit_btn)
+            self.table.setCellWidget(row, 4, delete_btn)
+
+        self.load_stats()
+
+    def load_stats(self):
+        timeouts = format_timeout_stats(get_timeout_stats()) or "none"
+        models = format_model_stats(get_model_stats()) or "no answers recorded yet"
+        self.stats_label.setText(f"Timeouts today:\n{timeouts}\n\nStage models:\n{models}")
 
     def mask_key(self, key):
         # mask the key for display
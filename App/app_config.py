@@ -0,0 +1,201 @@
+# app_config.py
+import json
+import os
+import copy
+import threading
+
+CONFIG_FILE = "config.json"
+
+# defaults for every setting, config.json only needs to contain the values that differ
+DEFAULT_CONFIG = {
+    "paths": {
+        "sources_dir": "C:/Users/GANT-NB/Music/anki/sources/",
+        "packages_dir": "C:/Users/GANT-NB/Music/anki/packages/",
+    },
+    "build": {
+        # source files from this size on are built by the bounded-memory streaming builder
+        "streaming_threshold_bytes": 1000000,
+        # clips in flight per tts worker while streaming
+        "streaming_window": 4,
+        # worker processes of build_all.py, 0 means one per core
+        "processes": 0,
+    },
+    "pipeline": {
+        # streaming mode: characters of extracted text per llm request, parallel llm requests
+        # and the size of the bounded queues between the stages
+        "chunk_chars": 3000,
+        "llm_workers": 2,
+        "queue_size": 8,
+    },
+    "bulk": {
+        # name of the subdeck of every unit and card type in a bulk package
+        "deck_name": "German::Unit {label}::{card_type}",
+        "package_name": "en_to_deu_bulk.apkg",
+    },
+    "preprocess": {
+        # local cleanup of the extracted text before it is sent to the llm
+        "enabled": True,
+        # pages whose word shingles overlap this much with an earlier page are dropped
+        "near_duplicate_threshold": 0.9,
+        # lines repeated at the top or bottom of this share of pages are running headers
+        "header_min_share": 0.5,
+    },
+    "llm": {
+        # classify and enrich all words in one json request instead of two free text requests
+        "structured_output": True,
+        # "groq" rotates the keys from api_keys.json, "openai" is any OpenAI compatible server
+        "providers": {
+            "groq": {"type": "groq"},
+            "local": {"type": "openai", "base_url": "http://localhost:8080/v1", "api_key": ""},
+        },
+        # model chain per stage: a fast model first, the next one if the answer is invalid or rate-limited.
+        # "provider:model" picks another provider than groq, e.g. "local:qwen2.5-7b-instruct"
+        "stage_models": {
+            "clean": ["llama-3.1-8b-instant", "llama-3.3-70b-versatile"],
+            "verbs": ["llama-3.3-70b-versatile"],
+            "except_verbs": ["llama-3.3-70b-versatile"],
+            "classify": ["llama-3.3-70b-versatile"],
+        },
+        # share of lines that must be well formed for an answer to be accepted
+        "min_valid_ratio": 0.9,
+        # re-ask missing or malformed items after the llm stages, up to this many at once
+        "repair": True,
+        "max_repair_items": 100,
+        # streaming mode: every file is a unit of its own and several waiting units are sent in one
+        # request per stage, so the long system prompts are sent once per group. units whose
+        # section of the answer is missing or invalid are sent again on their own. only units that
+        # are already extracted are packed, a unit is never held back to wait for more. with
+        # structured_output on only the clean stage is packed, the json request stays per unit
+        "pack_units": False,
+        "pack_max_units": 4,
+        "pack_max_chars": 6000,
+    },
+    "usage": {
+        # groq free tier limits per key, models without an entry are not checked
+        "daily_token_limits": {
+            "llama-3.3-70b-versatile": 100000,
+            "llama-3.1-8b-instant": 500000,
+        },
+        "daily_request_limits": {
+            "llama-3.3-70b-versatile": 1000,
+            "llama-3.1-8b-instant": 14400,
+        },
+    },
+    "profiling": {
+        # records the tracemalloc peak and top allocation sites of every stage, slows the app down
+        "memory": False,
+        "top_allocations": 10,
+        # stack frames stored per allocation
+        "frames": 1,
+        # peak in MB per stage, larger peaks are reported while profiling
+        "budgets_mb": {},
+        # budgets checked by memory_profile.py for the reference inputs of 1k and 10k rows
+        "reference_budgets_mb": {
+            "1000": {"parse": 2, "deck_verbs": 25, "deck_subs": 25},
+            "10000": {"parse": 15, "deck_verbs": 220, "deck_subs": 220},
+        },
+    },
+    "service": {
+        # build_service.py listens here, use "0.0.0.0" with a token to share it on the lan
+        "host": "127.0.0.1",
+        "port": 8765,
+        "workers": 2,
+        "jobs_dir": "service_jobs",
+        "max_upload_mb": 200,
+        # finished jobs, their uploads and packages are deleted after this many hours
+        "job_max_age_hours": 24,
+        # clips kept in the tts cache shared by all jobs, the oldest are dropped first
+        "tts_cache_clips": 5000,
+        # shared secret sent in the X-Build-Token header, the same value on the service and its clients
+        "token": "",
+        # the gui sends its builds to this service when set, e.g. "http://buildbox:8765"
+        "url": "",
+    },
+    "deadlines": {
+        # seconds before a call is abandoned, 0 waits forever. a stuck tesseract process is
+        # killed and retried, a stalled llm request moves on to the next key or model
+        "ocr_seconds": 120,
+        "ocr_retries": 1,
+        "llm_seconds": 90,
+        "tts_seconds": 30,
+        "tts_retries": 2,
+    },
+    "tts": {
+        # parallel gTTS requests shared by all decks of a build
+        "workers": 8,
+        # speak verb forms one by one and join the cached clips, forms repeat across verbs and units
+        "segment_verbs": False,
+        "segment_silence_ms": 300,
+        # segments are also cached in this directory across builds, empty to keep them in memory only
+        "segment_cache_dir": "tts_cache",
+    },
+    "ocr": {
+        # "auto" uses the in-process tesserocr engine when installed, "pytesseract" forces subprocesses
+        "engine": "auto",
+        "engine_pool_size": 0,
+        "tessdata_path": "C:/Program Files/Tesseract-OCR/tessdata",
+        "preprocess": True,
+        "target_dpi": 300,
+        # long side of a textbook page, used to guess the dpi of photos without dpi info
+        "page_long_side_inches": 11.7,
+        "binarize": True,
+        "binarize_window": 31,
+        "binarize_offset": 10,
+        "deskew": True,
+        "max_skew_degrees": 5,
+        "psm": 6,
+        "oem": 1,
+        # passed to tesseract as is. tesserocr takes "-c name=value" and "--dpi N" only,
+        # any other option switches to the pytesseract engine
+        "extra_args": "",
+    },
+}
+
+
+def merge_config(defaults, overrides):
+    # recursively merge user overrides into a copy of the defaults
+    merged = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_config():
+    # load config.json on top of the defaults. a missing or broken file gives the defaults
+    if not os.path.exists(CONFIG_FILE):
+        return copy.deepcopy(DEFAULT_CONFIG)
+
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            content = f.read()
+            if not content.strip():
+                return copy.deepcopy(DEFAULT_CONFIG)
+            return merge_config(DEFAULT_CONFIG, json.loads(content))
+    except json.JSONDecodeError:
+        print("Error: Invalid JSON format in config file.")
+        return copy.deepcopy(DEFAULT_CONFIG)
+
+
+# config.json is read once per process, every tts clip, ocr image and llm call asks for a section
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config_section(name):
+    # the returned section is shared, callers must not modify it
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = load_config()
+    return _config[name]
+
+
+def reload_config():
+    # drops the cached config, the next get_config_section reads config.json again
+    global _config
+    with _config_lock:
+        _config = None
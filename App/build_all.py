@@ -0,0 +1,141 @@
+# build_all.py
+#
+# make-style build of every unit in the sources directory:
+#   python build_all.py [--force] [--dry-run] [--delta] [--jobs N]
+# a package is rebuilt only if its source file, the card templates or the build
+# settings changed since the last successful build. with --delta a changed unit
+# gets a small package with only its new and changed notes next to the full one.
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app_config import get_config_section
+from anki_utils import (CARD_TYPES, find_source_labels, source_path, package_path, template_version,
+                        create_deck_from_source, build_delta_package, load_note_manifest)
+
+MANIFEST_NAME = "build_manifest.json"
+
+
+def manifest_path():
+    return os.path.join(get_config_section("paths")["packages_dir"], MANIFEST_NAME)
+
+
+def load_manifest():
+    path = manifest_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print("Error: Invalid JSON format in build manifest, rebuilding everything.")
+        return {}
+
+
+def save_manifest(manifest):
+    # written to a temporary file first so an interrupted build never leaves a broken manifest
+    path = manifest_path()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+# tts settings that change the audio in a package, the number of workers and the cache directory don't
+TTS_CONTENT_KEYS = ("segment_verbs", "segment_silence_ms")
+
+
+def settings_version():
+    # settings that change the content of a package, the number of processes doesn't
+    build_settings = {key: value for key, value in get_config_section("build").items() if key != "processes"}
+    tts = get_config_section("tts")
+    build_settings["tts"] = {key: tts[key] for key in TTS_CONTENT_KEYS}
+    return json.dumps(build_settings, sort_keys=True)
+
+
+def build_hash(kind, label, versions):
+    digest = hashlib.sha1()
+    with open(source_path(kind, label), "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    digest.update(versions.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def find_stale_targets(manifest, force=False):
+    # (kind, label, hash) of every package that is missing or out of date
+    versions = template_version() + settings_version()
+    stale = []
+    for label in find_source_labels():
+        for kind in CARD_TYPES:
+            if not os.path.exists(source_path(kind, label)):
+                continue
+            current_hash = build_hash(kind, label, versions)
+            target = f"{kind} {label}"
+            up_to_date = (
+                manifest.get(target) == current_hash
+                and os.path.exists(package_path(kind, label))
+            )
+            if force or not up_to_date:
+                stale.append((kind, label, current_hash))
+    return stale
+
+
+def build_target(kind, label, delta=False):
+    # runs in a worker process, returns (path, is_delta). a delta needs the note manifest of an earlier build
+    if delta:
+        path = build_delta_package(kind, label)
+        if path is not None:
+            return path, True
+        if load_note_manifest(kind, label) is not None:
+            # no note changed since the last import
+            return None, True
+    if not create_deck_from_source(kind, label):
+        # every row of the source is invalid, an old package must not count as up to date
+        raise ValueError(f"no valid rows in {source_path(kind, label)}, no package written")
+    return package_path(kind, label), False
+
+
+def build_all(force=False, dry_run=False, jobs=None, delta=False):
+    manifest = load_manifest()
+    stale = find_stale_targets(manifest, force=force)
+    if not stale:
+        print("All packages are up to date.")
+        return []
+    print(f"{len(stale)} packages to build: " + ", ".join(f"{kind} {label}" for kind, label, _ in stale))
+    if dry_run:
+        return []
+
+    built = []
+    jobs = jobs or get_config_section("build")["processes"] or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(build_target, kind, label, delta and not force): (kind, label, current_hash)
+                   for kind, label, current_hash in stale}
+        for future in as_completed(futures):
+            kind, label, current_hash = futures[future]
+            try:
+                path, is_delta = future.result()
+            except Exception as e:
+                print(f"Error building {kind} {label}: {e}")
+                continue
+            if not is_delta:
+                # the manifest is saved after every package, so a failed run keeps its progress.
+                # after a delta the full package stays out of date until the next normal build
+                manifest[f"{kind} {label}"] = current_hash
+                save_manifest(manifest)
+            if path is not None:
+                built.append(path)
+    print(f"Built {len(built)} of {len(stale)} packages.")
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild out-of-date Anki packages from the sources directory.")
+    parser.add_argument("--force", action="store_true", help="rebuild every package")
+    parser.add_argument("--dry-run", action="store_true", help="only list the packages that would be built")
+    parser.add_argument("--delta", action="store_true",
+                        help="write only the added and changed notes of units that were built before")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+    build_all(force=args.force, dry_run=args.dry_run, jobs=args.jobs, delta=args.delta)
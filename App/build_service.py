@@ -0,0 +1,339 @@
+# build_service.py
+#
+# optional deck build service, so a team shares one set of api keys, caches and
+# rate limits:
+#   python build_service.py [--host HOST] [--port PORT] [--workers N]
+#
+# every job is built in jobs_dir/<id>/ and removed job_max_age_hours after it finished.
+# with service.token set, every request needs it in the X-Build-Token header.
+#
+#   POST /jobs                            {"label": ..., "verbs": text, "subs": text} or
+#                                         {"label": ..., "files": [{"name": ..., "data": base64}],
+#                                          "page_ranges": {name: "1-3"},
+#                                          "regions": {name: [left, top, right, bottom]}}
+#   GET  /jobs                            all jobs
+#   GET  /jobs/<id>                       state, last status message and package names
+#   GET  /jobs/<id>/packages/<name>       a finished .apkg
+import argparse
+import base64
+import hmac
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import httpx
+from app_config import get_config_section
+
+MB = 1024 * 1024
+TOKEN_HEADER = "X-Build-Token"
+
+
+class Job:
+    def __init__(self, payload):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = str(payload["label"]).strip()
+        self.payload = payload
+        self.state = "queued"  # queued, running, done, failed
+        self.message = ""
+        self.packages = {}  # name -> path
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "label": self.label,
+            "state": self.state,
+            "message": self.message,
+            "packages": sorted(self.packages),
+        }
+
+
+class BuildService:
+    """Job queue with a pool of worker threads that run the normal build functions."""
+
+    def __init__(self, workers=None):
+        options = get_config_section("service")
+        self.jobs_dir = options["jobs_dir"]
+        self.max_age = options["job_max_age_hours"] * 3600
+        self.workers = workers or options["workers"]
+        # one tts pool and clip cache for all jobs, words repeat across units and users
+        self.synthesizer = None
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        # jobs live in memory only, the directories of an earlier run can't be served any more
+        if os.path.isdir(self.jobs_dir):
+            for name in os.listdir(self.jobs_dir):
+                shutil.rmtree(os.path.join(self.jobs_dir, name), ignore_errors=True)
+        self.threads = [threading.Thread(target=self.work, daemon=True) for _ in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, payload):
+        label = str(payload.get("label", "")).strip()
+        if not label:
+            raise ValueError("A job needs a label.")
+        if os.path.basename(label) != label or label in (".", ".."):
+            # the label ends up in file names
+            raise ValueError("A label can't contain path separators.")
+        if not any(payload.get(key) for key in ("verbs", "subs", "files")):
+            raise ValueError("A job needs verbs or subs text or files.")
+        self.prune()
+        job = Job(payload)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.queue.put(job)
+        return job
+
+    def prune(self):
+        # forgets finished jobs older than the max age and deletes their uploads and packages
+        with self.lock:
+            old = [job for job in self.jobs.values()
+                   if job.finished is not None and time.time() - job.finished > self.max_age]
+            for job in old:
+                del self.jobs[job.id]
+        for job in old:
+            shutil.rmtree(self.job_dir(job), ignore_errors=True)
+
+    def job_dir(self, job):
+        return os.path.join(self.jobs_dir, job.id)
+
+    def get_synthesizer(self):
+        # created on first use, the client functions of this module work without the build dependencies
+        from anki_utils import AudioSynthesizer
+
+        with self.lock:
+            if self.synthesizer is None:
+                self.synthesizer = AudioSynthesizer(max_cached=get_config_section("service")["tts_cache_clips"])
+            return self.synthesizer
+
+    def close(self):
+        if self.synthesizer is not None:
+            self.synthesizer.close()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created)
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            job.state = "running"
+            try:
+                paths = self.run_job(job)
+                job.packages = {os.path.basename(path): path for path in paths}
+                job.state = "done"
+                job.message = f"Created {len(paths)} packages"
+            except Exception as e:
+                job.state = "failed"
+                job.message = str(e)
+                print(f"Job {job.id} failed: {e}")
+            finally:
+                # the payload may hold whole scans, it isn't needed any more
+                job.payload = None
+                job.finished = time.time()
+
+    def run_job(self, job):
+        # imported here so the client functions below work without the build dependencies
+        from anki_utils import build_decks
+        from pipeline import StreamingPipeline
+        from row_utils import VERB_FIELDS, SUBS_FIELDS, parse_rows
+
+        def status(text):
+            job.message = text
+
+        # jobs never share files: uploads, sources and packages all live in the job directory.
+        # pdf extraction in parallel jobs is safe, pdfium calls share one lock in source_to_txt_utils
+        job_dir = self.job_dir(job)
+        packages_dir = os.path.join(job_dir, "packages")
+        os.makedirs(packages_dir, exist_ok=True)
+        payload = job.payload
+        if payload.get("files"):
+            upload_dir = os.path.join(job_dir, "uploads")
+            sources_dir = os.path.join(job_dir, "sources")
+            os.makedirs(upload_dir, exist_ok=True)
+            os.makedirs(sources_dir, exist_ok=True)
+            paths = []
+            page_ranges = {}
+            regions = {}
+            for file in payload["files"]:
+                # only the base name, uploads can't write outside the job directory
+                path = os.path.join(upload_dir, os.path.basename(file["name"]))
+                with open(path, "wb") as f:
+                    f.write(base64.b64decode(file["data"]))
+                paths.append(path)
+                if file["name"] in payload.get("page_ranges", {}):
+                    page_ranges[path] = payload["page_ranges"][file["name"]]
+                if file["name"] in payload.get("regions", {}):
+                    regions[path] = parse_region_payload(payload["regions"][file["name"]])
+            return StreamingPipeline(paths, job.label, page_ranges, status=status,
+                                     packages_dir=packages_dir, sources_dir=sources_dir, regions=regions,
+                                     synthesizer=self.get_synthesizer()).run()
+
+        verb_rows, _ = parse_rows(payload.get("verbs", ""), len(VERB_FIELDS))
+        subs_rows, _ = parse_rows(payload.get("subs", ""), len(SUBS_FIELDS))
+        return build_decks(job.label, verb_rows, subs_rows, status=status, packages_dir=packages_dir,
+                           synthesizer=self.get_synthesizer())
+
+
+def parse_region_payload(region):
+    # [left, top, right, bottom] as fractions of the page, as saved in crop_regions.json
+    if not isinstance(region, list) or len(region) != 4:
+        raise ValueError("A crop region needs four values: left, top, right, bottom.")
+    left, top, right, bottom = (float(value) for value in region)
+    if not (0 <= left < right <= 1 and 0 <= top < bottom <= 1):
+        raise ValueError("Crop region values must be fractions with left < right and top < bottom.")
+    return left, top, right, bottom
+
+
+class BuildRequestHandler(BaseHTTPRequestHandler):
+    service = None  # set by serve()
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        # without a configured token every request is accepted, fine on 127.0.0.1 only
+        token = get_config_section("service")["token"]
+        if not token or hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), token):
+            return True
+        self.send_json(401, {"error": "Missing or wrong token"})
+        return False
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        if self.path.rstrip("/") != "/jobs":
+            self.send_json(404, {"error": "Not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        if length > get_config_section("service")["max_upload_mb"] * MB:
+            self.send_json(413, {"error": "Upload too large"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            job = self.service.submit(payload)
+        except (ValueError, AttributeError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_json(202, job.to_dict())
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        # clients percent-encode the path, e.g. "en_to_deu_subs_Unit%2013.apkg"
+        parts = [unquote(part) for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["jobs"]:
+            self.send_json(200, [job.to_dict() for job in self.service.list()])
+            return
+        if len(parts) < 2 or parts[0] != "jobs":
+            self.send_json(404, {"error": "Not found"})
+            return
+        job = self.service.get(parts[1])
+        if job is None:
+            self.send_json(404, {"error": "Unknown job"})
+            return
+        if len(parts) == 2:
+            self.send_json(200, job.to_dict())
+            return
+        if len(parts) == 4 and parts[2] == "packages" and parts[3] in job.packages:
+            self.send_file(job.packages[parts[3]])
+            return
+        self.send_json(404, {"error": "Not found"})
+
+    def send_file(self, path):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+
+def serve(host=None, port=None, workers=None):
+    options = get_config_section("service")
+    BuildRequestHandler.service = BuildService(workers)
+    server = ThreadingHTTPServer((host or options["host"], port or options["port"]), BuildRequestHandler)
+    if not options["token"] and server.server_address[0] not in ("127.0.0.1", "localhost"):
+        print("Warning: the service is reachable from other hosts without a token, set service.token.")
+    print(f"Build service listening on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        BuildRequestHandler.service.close()
+
+
+# --- client ---
+def auth_headers():
+    # clients send the same service.token as the server checks
+    token = get_config_section("service")["token"]
+    return {TOKEN_HEADER: token} if token else {}
+
+
+def submit_job(url, payload):
+    response = httpx.post(url.rstrip("/") + "/jobs", json=payload, headers=auth_headers(), timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def file_payload(path):
+    with open(path, "rb") as f:
+        return {"name": os.path.basename(path), "data": base64.b64encode(f.read()).decode("ascii")}
+
+
+def get_job(url, job_id):
+    response = httpx.get(f"{url.rstrip('/')}/jobs/{job_id}", headers=auth_headers(), timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def download_package(url, job_id, name, path):
+    with httpx.stream("GET", f"{url.rstrip('/')}/jobs/{job_id}/packages/{name}", headers=auth_headers(),
+                      timeout=60) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_bytes():
+                f.write(chunk)
+    return path
+
+
+def wait_for_job(url, job_id, status=None, poll_seconds=2):
+    # polls until the job is done or failed or status returns False, returns the last job state
+    while True:
+        job = get_job(url, job_id)
+        if status and status(job) is False:
+            return job
+        if job["state"] in ("done", "failed"):
+            return job
+        time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP service that builds Anki packages.")
+    parser.add_argument("--host", default=None, help="address to listen on")
+    parser.add_argument("--port", type=int, default=None, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=None, help="jobs built at the same time")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
@@ -0,0 +1,91 @@
+# crop_regions.py
+import json
+import os
+
+CROP_REGIONS_FILE = "crop_regions.json"
+
+# regions are (left, top, right, bottom) as fractions of the page size, so one region
+# fits every page of the same layout no matter the resolution of the scan
+
+
+def load_crop_regions():
+    # {"files": {path: region}, "templates": {name: region}, "file_templates": {path: name}}
+    data = {"files": {}, "templates": {}, "file_templates": {}}
+    if not os.path.exists(CROP_REGIONS_FILE):
+        return data
+
+    try:
+        with open(CROP_REGIONS_FILE, "r", encoding="utf-8") as f:
+            content = f.read()
+            if content.strip():
+                data.update(json.loads(content))
+    except json.JSONDecodeError:
+        print("Error: Invalid JSON format in crop regions file.")
+    return data
+
+
+def save_crop_regions(data):
+    with open(CROP_REGIONS_FILE, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+def get_crop_region(path):
+    # region of a file: its own region first, then the region of its page template
+    data = load_crop_regions()
+    if path in data["files"]:
+        return tuple(data["files"][path])
+    template = data["file_templates"].get(path)
+    if template in data["templates"]:
+        return tuple(data["templates"][template])
+    return None
+
+
+def parse_region(text):
+    # "10, 40, 90, 100" in percent -> (0.1, 0.4, 0.9, 1.0)
+    values = [float(value) / 100 for value in text.split(",")]
+    if len(values) != 4:
+        raise ValueError("A crop region needs four values: left, top, right, bottom.")
+    left, top, right, bottom = values
+    if not (0 <= left < right <= 1 and 0 <= top < bottom <= 1):
+        raise ValueError("Crop region values must be percentages with left < right and top < bottom.")
+    return left, top, right, bottom
+
+
+def apply_crop_setting(paths, text):
+    """
+    Sets the crop region of the given files from user input:
+      "10,40,90,100"          region in percent for these files
+      "name:10,40,90,100"     saves the page template "name" and uses it for these files
+      "name"                  uses the existing page template "name"
+      ""                      removes the crop region of these files
+    """
+    data = load_crop_regions()
+    text = text.strip()
+    for path in paths:
+        data["files"].pop(path, None)
+        data["file_templates"].pop(path, None)
+
+    if text:
+        name, separator, region_text = text.rpartition(":")
+        if not separator:
+            if any(ch.isdigit() for ch in text) and "," in text:
+                region = parse_region(text)
+                for path in paths:
+                    data["files"][path] = list(region)
+            elif text in data["templates"]:
+                for path in paths:
+                    data["file_templates"][path] = text
+            else:
+                raise ValueError(f"Unknown page template '{text}'.")
+        else:
+            data["templates"][name.strip()] = list(parse_region(region_text))
+            for path in paths:
+                data["file_templates"][path] = name.strip()
+
+    save_crop_regions(data)
+
+
+def crop_image(img, region):
+    left, top, right, bottom = region
+    width, height = img.size
+    return img.crop((int(left * width), int(top * height), int(right * width), int(bottom * height)))
@@ -0,0 +1,181 @@
+# file_list_panel.py
+
+import os
+from collections import OrderedDict
+from PyQt5.QtWidgets import QListWidget, QListWidgetItem, QAbstractItemView
+from PyQt5.QtCore import Qt, QSize, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap, QIcon
+
+THUMBNAIL_SIZE = 96
+THUMBNAIL_CACHE_SIZE = 300
+
+
+class ThumbnailCache:
+    """In-memory LRU cache: path -> (QImage, info)."""
+
+    def __init__(self, max_entries=THUMBNAIL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, path):
+        entry = self.entries.get(path)
+        if entry is not None:
+            self.entries.move_to_end(path)
+        return entry
+
+    def put(self, path, image, info):
+        self.entries[path] = (image, info)
+        self.entries.move_to_end(path)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def load_pdf_thumbnail(path):
+    # first page rendered at thumbnail size, plus the page count
+    import pypdfium2 as pdfium
+    from source_to_txt_utils import PDFIUM_LOCK
+
+    # the thumbnail pool and the extraction workers share one pdfium library
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            page_count = len(pdf)
+            page = pdf[0]
+            try:
+                width, height = page.get_size()
+                bitmap = page.render(scale=THUMBNAIL_SIZE / max(width, height))
+                img = bitmap.to_pil().convert("RGBA")
+            finally:
+                page.close()
+        finally:
+            pdf.close()
+    data = img.tobytes("raw", "RGBA")
+    # copy() detaches the image from the python buffer
+    image = QImage(data, img.width, img.height, QImage.Format_RGBA8888).copy()
+    return image, page_count
+
+
+def load_image_thumbnail(path):
+    # QImageReader decodes straight to the scaled size, which is cheap for jpegs
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid():
+        reader.setScaledSize(size.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio))
+    return reader.read(), 1
+
+
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, QImage, dict)  # (path, thumbnail, info)
+
+
+class ThumbnailTask(QRunnable):
+    """Loads the thumbnail, page count and size of one file on the thread pool."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        info = {"size": 0, "pages": 0, "error": ""}
+        image = QImage()
+        try:
+            info["size"] = os.path.getsize(self.path)
+            if ".pdf" in self.path:
+                image, info["pages"] = load_pdf_thumbnail(self.path)
+            else:
+                image, info["pages"] = load_image_thumbnail(self.path)
+        except Exception as e:
+            info["error"] = str(e)
+        self.signals.loaded.emit(self.path, image, info)
+
+
+class FileListPanel(QListWidget):
+    """
+    List of the selected files with thumbnails, page counts and sizes. Files can
+    be reordered by drag and drop and deselected with their checkbox. Thumbnails
+    are loaded on a thread pool only for the items that are scrolled into view.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cache = ThumbnailCache()
+        self.requested = set()
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max(1, min(4, QThreadPool.globalInstance().maxThreadCount())))
+        self.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.setDragDropMode(QAbstractItemView.InternalMove)
+        self.setDefaultDropAction(Qt.MoveAction)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setUniformItemSizes(True)
+        self.verticalScrollBar().valueChanged.connect(self.load_visible)
+
+    def set_paths(self, paths):
+        self.clear()
+        self.requested = set()
+        for path in paths:
+            item = QListWidgetItem(os.path.basename(path))
+            item.setData(Qt.UserRole, path)
+            item.setToolTip(path)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            self.addItem(item)
+            cached = self.cache.get(path)
+            if cached is not None:
+                self.apply_thumbnail(item, *cached)
+                self.requested.add(path)
+        self.load_visible()
+
+    def checked_paths(self):
+        # checked files in the order shown in the list
+        paths = []
+        for row in range(self.count()):
+            item = self.item(row)
+            if item.checkState() == Qt.Checked:
+                paths.append(item.data(Qt.UserRole))
+        return paths
+
+    def load_visible(self):
+        viewport_rect = self.viewport().rect()
+        for row in range(self.count()):
+            item = self.item(row)
+            path = item.data(Qt.UserRole)
+            if path in self.requested:
+                continue
+            if not self.visualItemRect(item).intersects(viewport_rect):
+                continue
+            self.requested.add(path)
+            task = ThumbnailTask(path)
+            task.signals.loaded.connect(self.on_thumbnail_loaded)
+            self.thread_pool.start(task)
+
+    def on_thumbnail_loaded(self, path, image, info):
+        # runs in the gui thread, QPixmap may only be created here
+        self.cache.put(path, image, info)
+        for row in range(self.count()):
+            item = self.item(row)
+            if item.data(Qt.UserRole) == path:
+                self.apply_thumbnail(item, image, info)
+
+    def apply_thumbnail(self, item, image, info):
+        if not image.isNull():
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+        name = os.path.basename(item.data(Qt.UserRole))
+        if info["error"]:
+            item.setText(f"{name}\nCan't read file: {info['error']}")
+        else:
+            pages = "1 page" if info["pages"] == 1 else f"{info['pages']} pages"
+            item.setText(f"{name}\n{pages}, {format_size(info['size'])}")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.load_visible()
@@ -0,0 +1,126 @@
+# llm_providers.py
+import httpx
+
+# groq is only needed when a stage actually uses the groq provider
+try:
+    from groq import Groq, RateLimitError, APIStatusError, APITimeoutError, APIConnectionError
+except ImportError:
+    Groq = None
+
+
+class ProviderRateLimitError(Exception):
+    """Raised by a provider when the endpoint answers with 429."""
+
+
+class ProviderTimeoutError(Exception):
+    """Raised by a provider when a request runs past its deadline."""
+
+
+class ProviderError(Exception):
+    """
+    Raised by a provider for any other failed request. Transient errors (server
+    errors, dropped connections) are retried with the next key, the others
+    (bad request, bad key, unknown model) are passed on to the caller.
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = status_code is None or status_code >= 500
+
+
+class CompletionResult:
+    def __init__(self, content, prompt_tokens=0, completion_tokens=0):
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class GroqProvider:
+    """Groq cloud through the groq SDK, one instance per api key."""
+    uses_key_rotation = True
+
+    def __init__(self, api_key, timeout=None):
+        if Groq is None:
+            raise RuntimeError("The groq package is not installed.")
+        # no retries inside the sdk, a stalled request is retried with the next key instead
+        self.client = Groq(api_key=api_key, timeout=timeout, max_retries=0)
+
+    def complete(self, messages, model, **kwargs):
+        try:
+            chat_completion = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                **kwargs,
+            )
+        except APITimeoutError as e:
+            raise ProviderTimeoutError(str(e)) from e
+        except APIConnectionError as e:
+            raise ProviderError(str(e)) from e
+        except (RateLimitError, APIStatusError) as e:
+            if e.status_code == 429:
+                raise ProviderRateLimitError(str(e)) from e
+            raise ProviderError(str(e), e.status_code) from e
+        usage = chat_completion.usage
+        return CompletionResult(
+            chat_completion.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+
+    def close(self):
+        self.client.close()
+
+
+class OpenAICompatibleProvider:
+    """
+    Any server with an OpenAI style /chat/completions endpoint, e.g. llama.cpp
+    or vLLM on localhost or the LAN.
+    """
+    uses_key_rotation = False
+
+    def __init__(self, base_url, api_key="", timeout=None):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.client = httpx.Client(base_url=base_url.rstrip("/"), headers=headers, timeout=timeout)
+
+    def complete(self, messages, model, **kwargs):
+        payload = {"model": model, "messages": messages}
+        payload.update(kwargs)
+        try:
+            response = self.client.post("/chat/completions", json=payload)
+        except httpx.TimeoutException as e:
+            raise ProviderTimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise ProviderError(str(e)) from e
+        if response.status_code == 429:
+            raise ProviderRateLimitError(response.text)
+        if response.is_error:
+            raise ProviderError(f"{response.status_code}: {response.text}", response.status_code)
+        data = response.json()
+        usage = data.get("usage") or {}
+        return CompletionResult(
+            data["choices"][0]["message"]["content"],
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+        )
+
+    def close(self):
+        self.client.close()
+
+
+PROVIDER_TYPES = {
+    "groq": GroqProvider,
+    "openai": OpenAICompatibleProvider,
+}
+
+
+def split_model_name(name, providers=(), default_provider="groq"):
+    """
+    "local:qwen2.5-7b-instruct" -> ("local", "qwen2.5-7b-instruct") when "local"
+    is one of the configured providers. Other names, "llama3:8b" included, are
+    model names of the default provider.
+    """
+    provider, separator, model = name.partition(":")
+    if not separator or provider not in providers:
+        return default_provider, name
+    return provider, model
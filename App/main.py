@@ -3,9 +3,11 @@
 import sys
 from PyQt5.QtWidgets import QApplication
 from main_window import MainWindow
+from ai_utils import close_clients
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(close_clients)
     window = MainWindow()
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
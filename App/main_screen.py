@@ -4,6 +4,9 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QDialog
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtWidgets import QProgressBar
 import math
+from file_list_panel import FileListPanel
+from custom_dialog import SingleInputDialog
+from source_to_txt_utils import parse_page_range
 
 
 class ProgressBarDialog(QDialog):
@@ -105,6 +108,7 @@ class MainScreen(QWidget):
         super().__init__()
         self.main_window = main_window
         self.current_file_paths = []
+        self.page_ranges = {}  # pdf path -> page selection like "12-15"
         self.progress_dialog = None
         self.init_ui()
 
@@ -129,10 +133,19 @@ class MainScreen(QWidget):
         self.path_label.setWordWrap(True)
         layout.addWidget(self.path_label)
 
+        # selected files with thumbnails, can be reordered and deselected before processing
+        self.file_list = FileListPanel()
+        self.file_list.setMinimumSize(600, 300)
+        self.file_list.setVisible(False)
+        self.file_list.itemChanged.connect(lambda _: self.update_path_display())
+        layout.addWidget(self.file_list)
+
         self.setLayout(layout)
 
     def update_path_display(self):
         # updates the label to show the currently selected file paths
+        self.file_list.setVisible(bool(self.current_file_paths))
+        checked = len(self.file_list.checked_paths())
         count = len(self.current_file_paths)
         if count == 0:
             self.path_label.setText("No files selected")
@@ -143,7 +156,7 @@ class MainScreen(QWidget):
             self.path_label.setText(f"Selected:\n{filename}")
             self.path_label.setToolTip(path)
         else:
-            self.path_label.setText(f"Selected {count} files")
+            self.path_label.setText(f"Selected {checked} of {count} files")
             tooltip_text = "\n".join([p.split("/")[-1] for p in self.current_file_paths])
             self.path_label.setToolTip(f"Files:\n{tooltip_text}")
 
@@ -163,9 +176,37 @@ class MainScreen(QWidget):
 
         if file_paths:
             self.current_file_paths = file_paths
+            self.file_list.set_paths(file_paths)
+            self.page_ranges = {}
+            pdf_paths = [path for path in file_paths if ".pdf" in path]
+            if pdf_paths:
+                self.ask_page_range(pdf_paths)
             self.update_path_display()
             print(f"[DEBUG] Selected files: {self.current_file_paths}")
 
+    def ask_page_range(self, pdf_paths):
+        # optional page selection for the selected pdfs, e.g. only the vocabulary pages of a textbook
+        prompt = "Pages to extract from the PDF files, e.g. 12-15, 20 (empty for all):"
+        page_range = ""
+        while True:
+            dialog = SingleInputDialog(parent=self, title="PDF Pages", initial_text=prompt)
+            dialog.input_field.setText(page_range)
+            if dialog.exec_() != 1:
+                return
+            page_range = dialog.get_data()
+            try:
+                # the page count isn't known yet, only the syntax is checked here
+                parse_page_range(page_range, 10000)
+                break
+            except ValueError:
+                prompt = f"'{page_range}' is not a valid page range, e.g. 12-15, 20 (empty for all):"
+        if page_range:
+            for path in pdf_paths:
+                self.page_ranges[path] = page_range
+
     def get_current_file_paths(self):
-        # returns a copy of the current file paths to avoid external modifications
-        return self.current_file_paths.copy()
\ No newline at end of file
+        # returns the checked files in the order of the file list
+        return self.file_list.checked_paths()
+
+    def get_page_ranges(self):
+        return dict(self.page_ranges)
\ No newline at end of file
@@ -1,15 +1,23 @@
 # main_window.py
-from PyQt5.QtWidgets import QMainWindow, QStackedWidget, QMenuBar, QMenu, QAction, QTextEdit
+from PyQt5.QtWidgets import QMainWindow, QStackedWidget, QMenuBar, QMenu, QAction
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 import traceback
 from custom_dialog import SingleInputDialog, ConfirmationDialog
-from anki_utils import create_s_deck, create_v_deck
-from source_to_txt_utils import extract_text_from_pdf, extract_text_from_image
-from ai_utils import clean_tokenized_text, extract_verbs, extract_except_verbs
+from anki_utils import build_decks, export_units, find_source_labels, export_tsv
+from source_to_txt_utils import iter_pdf_pages, extract_text_from_image
+from text_preprocess import dedupe_files, preprocess_pages
+from memory_profile import stage_memory
+from ai_utils import clean_tokenized_text, extract_verbs, extract_except_verbs, classify_and_enrich, repair_rows
 from settings_screen import SettingsScreen
 from styles import APP_STYLE
 from main_screen import MainScreen, ProgressBarDialog
+from table_editor import TableEditor
+from row_utils import VERB_FIELDS, SUBS_FIELDS, parse_rows
+from app_config import get_config_section
+from crop_regions import apply_crop_setting, get_crop_region
+from pipeline import StreamingPipeline, PipelineCancelled
+from build_service import submit_job, wait_for_job, download_package, file_payload
 import os
 
 
@@ -24,9 +32,11 @@ class TextProcessingWorker(QObject):
     error_occurred = pyqtSignal(str)  # Signal if an error happens: (error_message)
     finished = pyqtSignal()  # Signal when the worker has finished its run
 
-    def __init__(self, file_paths):
+    def __init__(self, file_paths, page_ranges=None):
         super().__init__()
         self.file_paths = file_paths
+        self.page_ranges = page_ranges or {}  # pdf path -> page selection
+        self.page_reports = []  # per pdf page extractor choice and timing
         self._is_running = True  # Flag to potentially allow cancellation (optional)
 
     @pyqtSlot()
@@ -37,32 +47,69 @@ class TextProcessingWorker(QObject):
             if not self._is_running:
                 return
             self.progress.emit(1, "Extracting text from files...")
-            text = ""
-            for path in self.file_paths:
-                if not self._is_running:
-                    return  # Check flag periodically
-                if ".pdf" in path:
-                    text += extract_text_from_pdf(path)
+            with stage_memory("extract"):
+                preprocess = get_config_section("preprocess")["enabled"]
+                file_paths = dedupe_files(self.file_paths) if preprocess else self.file_paths
+                pages = []
+                for path in file_paths:
+                    if not self._is_running:
+                        return  # Check flag periodically
+                    if ".pdf" in path:
+                        for page_text, page_report in iter_pdf_pages(path, self.page_ranges.get(path)):
+                            self.page_reports.append(page_report)
+                            pages.append(page_text)
+                    else:
+                        pages.append(extract_text_from_image(path))
+                if self.page_reports:
+                    methods = {}
+                    for page_report in self.page_reports:
+                        methods[page_report.method] = methods.get(page_report.method, 0) + 1
+                    summary = ", ".join(f"{method}: {count}" for method, count in methods.items())
+                    self.progress.emit(1, f"Extracted {len(self.page_reports)} PDF pages ({summary})")
+                if preprocess:
+                    # dedupe pages and strip headers and noise locally, every llm call gets a smaller input
+                    text, report = preprocess_pages(pages)
+                    self.progress.emit(1, f"Reduced text from ~{report['input_tokens']} to ~{report['output_tokens']} tokens")
                 else:
-                    text += extract_text_from_image(path)
+                    text = "\n".join(pages)
 
             # --- Stage 2: Clean Text ---
             if not self._is_running:
                 return
             self.progress.emit(2, "Cleaning and tokenizing text...")
-            cleaned_text = clean_tokenized_text(text)
+            with stage_memory("clean"):
+                cleaned_text = clean_tokenized_text(text)
 
             # --- Stage 3: Extract Verbs ---
             if not self._is_running:
                 return
-            self.progress.emit(3, "Extracting verbs...")
-            verbs_text = extract_verbs(cleaned_text)
+            structured_rows = None
+            if get_config_section("llm")["structured_output"]:
+                self.progress.emit(3, "Classifying words...")
+                try:
+                    with stage_memory("classify"):
+                        structured_rows = classify_and_enrich(cleaned_text)
+                except ValueError as e:
+                    # a broken json answer falls back to the two separate requests
+                    print(f"Structured output failed, using separate requests: {e}")
+            else:
+                self.progress.emit(3, "Extracting verbs...")
 
             # --- Stage 4: Extract Other Words ---
             if not self._is_running:
                 return
-            self.progress.emit(4, "Extracting other words and phrases...")
-            except_verbs_text = extract_except_verbs(cleaned_text)
+            if structured_rows is not None:
+                self.progress.emit(4, "Mapping words to deck rows...")
+                verbs_text, except_verbs_text = structured_rows
+            else:
+                self.progress.emit(4, "Extracting verbs and other words...")
+                with stage_memory("extract_words"):
+                    verbs_text = extract_verbs(cleaned_text)
+                    except_verbs_text = extract_except_verbs(cleaned_text)
+            if get_config_section("llm")["repair"]:
+                # re-ask only the items that came back missing or malformed
+                with stage_memory("repair"):
+                    verbs_text, except_verbs_text = repair_rows(cleaned_text, verbs_text, except_verbs_text)
 
             # --- Stage 5: Signal Completion ---
             if not self._is_running:
@@ -96,39 +143,166 @@ class DeckCreationWorker(QObject):
     @pyqtSlot()
     def run(self):
         try:
-            base_path = "C:/Users/GANT-NB/Music/anki/sources/"
+            base_path = get_config_section("paths")["sources_dir"]
 
             if not self._is_running:
                 return
             self.progress.emit(1, "Saving verbs.txt...")
-            with open(f"{base_path}verbs {self.label}.txt", "w", encoding="utf-8") as f:
+            with open(os.path.join(base_path, f"verbs {self.label}.txt"), "w", encoding="utf-8") as f:
                 f.write(self.vtext)
 
             if not self._is_running:
                 return
             self.progress.emit(2, "Saving subs.txt...")
-            with open(f"{base_path}subs {self.label}.txt", "w", encoding="utf-8") as f:
+            with open(os.path.join(base_path, f"subs {self.label}.txt"), "w", encoding="utf-8") as f:
                 f.write(self.stext)
 
             if not self._is_running:
                 return
-            self.progress.emit(3, "Creating verb deck...")
-            create_v_deck(self.label)
+            self.progress.emit(3, "Creating verb and noun/adjective decks...")
+            # rows are parsed from memory, the saved files are only kept as sources
+            verb_rows, invalid_verbs = parse_rows(self.vtext, len(VERB_FIELDS))
+            subs_rows, invalid_subs = parse_rows(self.stext, len(SUBS_FIELDS))
+            for line in invalid_verbs + invalid_subs:
+                print(f"Incorrect structure: {line}")
+            with stage_memory("decks"):
+                build_decks(self.label, verb_rows, subs_rows, status=lambda text: self.progress.emit(4, text))
 
             if not self._is_running:
                 return
-            self.progress.emit(4, "Creating noun/adjective deck...")
-            create_s_deck(self.label)
+            self.progress.emit(5, "Finalizing...")
+        except Exception as e:
+            error_msg = f"Error creating decks: {str(e)}\n{traceback.format_exc()}"
+            self.error_occurred.emit(error_msg)
+        finally:
+            self.finished.emit()
+
+# --- Worker Class for Bulk Export ---
+class BulkExportWorker(QObject):
+    progress = pyqtSignal(int, str)  # (stage, status)
+    finished = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, labels, path):
+        super().__init__()
+        self.labels = labels
+        self.path = path
+        self._is_running = True
 
+    @pyqtSlot()
+    def run(self):
+        try:
             if not self._is_running:
                 return
-            self.progress.emit(5, "Finalizing...")
+            self.progress.emit(1, f"Building {len(self.labels)} units...")
+            export_units(self.labels, self.path, status=lambda text: self.progress.emit(2, text))
+
+            if not self._is_running:
+                return
+            self.progress.emit(3, "Finalizing...")
         except Exception as e:
-            error_msg = f"Error creating decks: {str(e)}\n{traceback.format_exc()}"
+            error_msg = f"Error exporting units: {str(e)}\n{traceback.format_exc()}"
+            self.error_occurred.emit(error_msg)
+        finally:
+            self.finished.emit()
+
+# --- Worker Class for the Streaming Pipeline ---
+class StreamingBuildWorker(QObject):
+    progress = pyqtSignal(int, str)  # (stage, status)
+    finished = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, file_paths, label, page_ranges=None):
+        super().__init__()
+        self.file_paths = file_paths
+        self.label = label
+        self.page_ranges = page_ranges or {}
+        self.pipeline = None
+        self._is_running = True
+
+    def on_status(self, text):
+        self.progress.emit(1, text)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            if not self._is_running:
+                return
+            self.progress.emit(1, "Extracting, processing and building cards...")
+            # every stage polls the flag, a closed progress dialog stops the pipeline at the next row
+            self.pipeline = StreamingPipeline(self.file_paths, self.label, self.page_ranges, status=self.on_status,
+                                              cancelled=lambda: not self._is_running)
+            with stage_memory("pipeline"):
+                paths = self.pipeline.run()
+
+            if not self._is_running:
+                return
+            self.progress.emit(2, f"Created {len(paths)} packages")
+            self.progress.emit(3, "Finalizing...")
+        except PipelineCancelled:
+            # the user closed the progress dialog, not an error
+            return
+        except Exception as e:
+            error_msg = f"Error in streaming build: {str(e)}\n{traceback.format_exc()}"
+            self.error_occurred.emit(error_msg)
+        finally:
+            self.finished.emit()
+
+# --- Worker Class for Builds on the Build Service ---
+class ServiceBuildWorker(QObject):
+    progress = pyqtSignal(int, str)  # (stage, status)
+    finished = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, url, payload, file_paths=None, page_ranges=None):
+        super().__init__()
+        self.url = url
+        self.payload = payload
+        # files are read and encoded in the worker thread, scans can be large
+        self.file_paths = file_paths or []
+        self.page_ranges = page_ranges or {}
+        self._is_running = True
+
+    def on_job_status(self, job):
+        # a closed progress dialog stops the polling, the job itself keeps running on the service
+        if not self._is_running:
+            return False
+        self.progress.emit(1, f"[{job['state']}] {job['message']}")
+        return True
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            if self.file_paths:
+                self.progress.emit(1, f"Reading {len(self.file_paths)} files...")
+                self.payload["files"] = [file_payload(path) for path in self.file_paths]
+                self.payload["page_ranges"] = {os.path.basename(path): self.page_ranges[path]
+                                               for path in self.file_paths if path in self.page_ranges}
+                # crop regions are saved per local path, the service only sees the file names
+                regions = {os.path.basename(path): get_crop_region(path) for path in self.file_paths}
+                self.payload["regions"] = {name: list(region) for name, region in regions.items() if region}
+            self.progress.emit(1, f"Submitting job to {self.url}...")
+            job = submit_job(self.url, self.payload)
+            self.payload = None
+            job = wait_for_job(self.url, job["id"], status=self.on_job_status)
+            if not self._is_running:
+                return
+            if job["state"] == "failed":
+                raise RuntimeError(f"The build service failed: {job['message']}")
+
+            self.progress.emit(2, "Downloading packages...")
+            packages_dir = get_config_section("paths")["packages_dir"]
+            for name in job["packages"]:
+                download_package(self.url, job["id"], name, os.path.join(packages_dir, name))
+
+            self.progress.emit(3, "Finalizing...")
+        except Exception as e:
+            error_msg = f"Error in service build: {str(e)}\n{traceback.format_exc()}"
             self.error_occurred.emit(error_msg)
         finally:
             self.finished.emit()
 
+
 # --- MainWindow Class ---
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -164,19 +338,68 @@ class MainWindow(QMainWindow):
         self.actionOpen = QAction("Open", self)
         self.actionOpen.setShortcut("Ctrl+O")
         self.menuFile.addAction(self.actionOpen)
+        self.actionCropRegion = QAction("Crop region", self)
+        self.actionCropRegion.setShortcut("Ctrl+R")
+        self.menuFile.addAction(self.actionCropRegion)
         self.actionCreateTxt = QAction("Create txt", self)
         self.actionCreateTxt.setShortcut("Ctrl+T")
         self.menuFile.addAction(self.actionCreateTxt)
+        self.actionQuickBuild = QAction("Quick build (streaming)", self)
+        self.actionQuickBuild.setShortcut("Ctrl+Shift+D")
+        self.menuFile.addAction(self.actionQuickBuild)
         self.actionCreateDeck = QAction("Create deck", self)
         self.actionCreateDeck.setShortcut("Ctrl+D")
         self.menuFile.addAction(self.actionCreateDeck)
+        self.actionExportText = QAction("Export text only (no audio)", self)
+        self.actionExportText.setShortcut("Ctrl+E")
+        self.menuFile.addAction(self.actionExportText)
+        self.actionBulkExport = QAction("Bulk export", self)
+        self.actionBulkExport.setShortcut("Ctrl+B")
+        self.menuFile.addAction(self.actionBulkExport)
         self.actionSettings = QAction("Settings", self)
         self.actionSettings.setShortcut("Ctrl+N")
         self.menuFile.addAction(self.actionSettings)
         self.actionOpen.triggered.connect(self.main_screen.open_file_dialog)
         self.actionSettings.triggered.connect(lambda: self.stackedWidget.setCurrentWidget(self.settings_screen))
+        self.actionCropRegion.triggered.connect(self.set_crop_region)
         self.actionCreateTxt.triggered.connect(self.create_text_editors)
         self.actionCreateDeck.triggered.connect(self.create_decks)
+        self.actionExportText.triggered.connect(self.export_text)
+        self.actionQuickBuild.triggered.connect(self.quick_build)
+        self.actionBulkExport.triggered.connect(self.bulk_export)
+
+    def set_crop_region(self):
+        """Defines the part of the page that is extracted for the selected files."""
+        pathes = MainScreen.get_current_file_paths(self.main_screen)
+        if not pathes:
+            dialog = ConfirmationDialog(
+                parent=self,
+                title="Warning",
+                message="No files were selected",
+            )
+            dialog.setWindowIcon(QIcon("icons/warning_icon.png"))
+            dialog.exec_()
+            return
+
+        dialog = SingleInputDialog(
+            parent=self,
+            title="Crop Region",
+            initial_text="Region in percent: left, top, right, bottom (e.g. 0, 40, 100, 100).\n"
+                         "Prefix with 'name:' to save it as a page template, enter a template name "
+                         "to reuse it, or leave empty to process whole pages:"
+        )
+        if dialog.exec_() != 1:
+            return
+        try:
+            apply_crop_setting(pathes, dialog.get_data())
+        except ValueError as e:
+            error_dialog = ConfirmationDialog(
+                parent=self,
+                title="Invalid Crop Region",
+                message=str(e),
+            )
+            error_dialog.setWindowIcon(QIcon("icons/warning_icon.png"))
+            error_dialog.exec_()
 
     def create_text_editors(self):
         """Starts the text editor creation process in a background thread."""
@@ -209,7 +432,7 @@ class MainWindow(QMainWindow):
         # --- Setup Worker Thread ---
         # Always create a new thread and worker
         self.worker_thread = QThread()
-        self.worker = TextProcessingWorker(pathes)
+        self.worker = TextProcessingWorker(pathes, self.main_screen.get_page_ranges())
         # Move the worker to the thread
         self.worker.moveToThread(self.worker_thread)
 
@@ -241,7 +464,7 @@ class MainWindow(QMainWindow):
             # Update status text for the current stage
             self.progress_dialog.update_status(status_text)
             # If it's the last stage, complete the final checkpoint to finish
-            if stage == 5:
+            if stage == self.progress_dialog.chp_amount:
                 self.progress_dialog.complete_checkpoint()
 
     @pyqtSlot(str, str)
@@ -251,14 +474,14 @@ class MainWindow(QMainWindow):
         print("Worker finished successfully, creating text editors...")
         # Create first text editor window
         text_window1 = self.create_text_editor("verbs.txt")
-        text_edit1 = QTextEdit(text_window1)
+        text_edit1 = TableEditor(VERB_FIELDS, text_window1)
         text_edit1.setPlainText(verbs_text)
         text_window1.setCentralWidget(text_edit1)
         self.text_editors.append(text_edit1)
         text_window1.show()
         # Create second text editor window
         text_window2 = self.create_text_editor("subs.txt")
-        text_edit2 = QTextEdit(text_window2)
+        text_edit2 = TableEditor(SUBS_FIELDS, text_window2)
         text_edit2.setPlainText(except_verbs_text)
         text_window2.setCentralWidget(text_edit2)
         self.text_editors.append(text_edit2)
@@ -358,9 +581,12 @@ class MainWindow(QMainWindow):
                 return  # User canceled
             label = dialog.get_data().strip()
 
+        # with a build service configured the decks are built there and downloaded
+        service_url = get_config_section("service")["url"]
+
         # --- Setup Progress Dialog ---
         if self.progress_dialog is None:
-            self.progress_dialog = ProgressBarDialog(chp_amount=5, parent=self)
+            self.progress_dialog = ProgressBarDialog(chp_amount=3 if service_url else 5, parent=self)
             self.progress_dialog.setStyleSheet(APP_STYLE)
             self.progress_dialog.finished.connect(self.on_progress_dialog_finished)
         else:
@@ -374,7 +600,10 @@ class MainWindow(QMainWindow):
 
         # --- Setup Worker Thread ---
         self.worker_thread = QThread()
-        self.worker = DeckCreationWorker(vtext, stext, label)
+        if service_url:
+            self.worker = ServiceBuildWorker(service_url, {"label": label, "verbs": vtext, "subs": stext})
+        else:
+            self.worker = DeckCreationWorker(vtext, stext, label)
         self.worker.moveToThread(self.worker_thread)
 
         # Connect signals
@@ -391,6 +620,156 @@ class MainWindow(QMainWindow):
         # Start thread
         self.worker_thread.start()
 
+    def export_text(self):
+        """Writes the edited rows as tab separated files for Anki's importer, without tts or packaging."""
+        if len(self.text_editors) < 2:
+            dialog = ConfirmationDialog(
+                parent=self,
+                title="Warning",
+                message="No text editors available to extract content from.",
+            )
+            dialog.setWindowIcon(QIcon("icons/warning_icon.png"))
+            dialog.exec_()
+            return
+
+        label = ""
+        while label.strip() == "":
+            dialog = SingleInputDialog(
+                parent=self,
+                title="Deck Name",
+                initial_text="Enter deck name:"
+            )
+            dialog.setWindowIcon(QIcon("icons/create_key.png"))
+            if dialog.exec_() != 1:
+                return  # User canceled
+            label = dialog.get_data().strip()
+
+        # fast enough to run in the gui thread
+        verb_rows, invalid_verbs = parse_rows(self.text_editors[0].toPlainText(), len(VERB_FIELDS))
+        subs_rows, invalid_subs = parse_rows(self.text_editors[1].toPlainText(), len(SUBS_FIELDS))
+        for line in invalid_verbs + invalid_subs:
+            print(f"Incorrect structure: {line}")
+        paths = export_tsv(label, verb_rows, subs_rows)
+
+        message = "Exported to:\n" + "\n".join(paths) if paths else "No valid rows to export."
+        if invalid_verbs or invalid_subs:
+            message += f"\n{len(invalid_verbs) + len(invalid_subs)} invalid rows were skipped."
+        dialog = ConfirmationDialog(
+            parent=self,
+            title="Text Export",
+            message=message,
+        )
+        dialog.exec_()
+
+    def quick_build(self):
+        """Builds the decks straight from the selected files without the editing step."""
+        pathes = MainScreen.get_current_file_paths(self.main_screen)
+        if not pathes:
+            dialog = ConfirmationDialog(
+                parent=self,
+                title="Warning",
+                message="No files were selected",
+            )
+            dialog.setWindowIcon(QIcon("icons/warning_icon.png"))
+            dialog.exec_()
+            return
+
+        label = ""
+        while label.strip() == "":
+            dialog = SingleInputDialog(
+                parent=self,
+                title="Deck Name",
+                initial_text="Enter deck name:"
+            )
+            dialog.setWindowIcon(QIcon("icons/create_key.png"))
+            if dialog.exec_() != 1:
+                return  # User canceled
+            label = dialog.get_data().strip()
+
+        # --- Setup Progress Dialog ---
+        if self.progress_dialog is None:
+            self.progress_dialog = ProgressBarDialog(chp_amount=3, parent=self)
+            self.progress_dialog.setStyleSheet(APP_STYLE)
+            self.progress_dialog.finished.connect(self.on_progress_dialog_finished)
+        else:
+            self.progress_dialog.setup_progress_bar()
+
+        self.progress_dialog.setWindowTitle("Building Decks...")
+        self.progress_dialog.update_status("Starting...")
+        self.progress_dialog.show()
+
+        # --- Setup Worker Thread ---
+        self.worker_thread = QThread()
+        service_url = get_config_section("service")["url"]
+        if service_url:
+            self.worker = ServiceBuildWorker(service_url, {"label": label}, pathes, self.main_screen.get_page_ranges())
+        else:
+            self.worker = StreamingBuildWorker(pathes, label, self.main_screen.get_page_ranges())
+        self.worker.moveToThread(self.worker_thread)
+
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.update_progress_from_worker)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+        self.worker.error_occurred.connect(self.handle_worker_error)
+        self.worker.finished.connect(lambda: self.on_deck_creation_finished(label))
+
+        self.worker_thread.start()
+
+    def bulk_export(self):
+        """Packages several units from the sources directory into one .apkg."""
+        dialog = SingleInputDialog(
+            parent=self,
+            title="Bulk Export",
+            initial_text="Units to export, separated by commas (empty for all):"
+        )
+        dialog.setWindowIcon(QIcon("icons/create_key.png"))
+        if dialog.exec_() != 1:
+            return  # User canceled
+        labels = [label.strip() for label in dialog.get_data().split(",") if label.strip()]
+        if not labels:
+            labels = find_source_labels()
+        if not labels:
+            dialog = ConfirmationDialog(
+                parent=self,
+                title="Warning",
+                message="No source files found to export.",
+            )
+            dialog.setWindowIcon(QIcon("icons/warning_icon.png"))
+            dialog.exec_()
+            return
+
+        paths_config = get_config_section("paths")
+        path = os.path.join(paths_config["packages_dir"], get_config_section("bulk")["package_name"])
+
+        # --- Setup Progress Dialog ---
+        if self.progress_dialog is None:
+            self.progress_dialog = ProgressBarDialog(chp_amount=3, parent=self)
+            self.progress_dialog.setStyleSheet(APP_STYLE)
+            self.progress_dialog.finished.connect(self.on_progress_dialog_finished)
+        else:
+            self.progress_dialog.setup_progress_bar()
+
+        self.progress_dialog.setWindowTitle("Exporting Units...")
+        self.progress_dialog.update_status("Starting...")
+        self.progress_dialog.show()
+
+        # --- Setup Worker Thread ---
+        self.worker_thread = QThread()
+        self.worker = BulkExportWorker(labels, path)
+        self.worker.moveToThread(self.worker_thread)
+
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.update_progress_from_worker)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+        self.worker.error_occurred.connect(self.handle_worker_error)
+        self.worker.finished.connect(lambda: self.on_deck_creation_finished(", ".join(labels)))
+
+        self.worker_thread.start()
+
     @pyqtSlot()
     def on_deck_creation_finished(self, label):
         """Called when deck creation is successfully completed."""
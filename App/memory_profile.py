@@ -0,0 +1,150 @@
+# memory_profile.py
+import argparse
+import contextlib
+import time
+import tracemalloc
+from collections import namedtuple
+from app_config import get_config_section
+
+# peak and top allocation sites of one stage, sizes in bytes above the memory in use when the stage started
+StageMemory = namedtuple("StageMemory", ["stage", "peak", "current", "seconds", "top"])
+
+# reports of the stages profiled in this process, newest last
+STAGE_REPORTS = []
+
+MB = 1024 * 1024
+
+# the snapshots themselves are not part of a stage
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+
+def is_enabled():
+    return get_config_section("profiling")["memory"]
+
+
+@contextlib.contextmanager
+def stage_memory(stage, enabled=None):
+    """
+    Records the tracemalloc peak and the top allocation sites of the code in the
+    block when memory profiling is on, does nothing otherwise. Stages should not
+    be nested, every stage resets the peak.
+    """
+    if enabled is None:
+        enabled = is_enabled()
+    if not enabled:
+        yield
+        return
+
+    options = get_config_section("profiling")
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(options["frames"])
+    before = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        # allocations made in the stage and still alive at its end, by source line
+        top = after.compare_to(before, "lineno")[:options["top_allocations"]]
+        if started_here:
+            tracemalloc.stop()
+        report = StageMemory(stage, peak - baseline, current - baseline, seconds, top)
+        STAGE_REPORTS.append(report)
+        print(format_stage_report(report))
+        for violation in check_budgets([report], options["budgets_mb"]):
+            print(f"Memory budget exceeded: {violation}")
+
+
+def format_stage_report(report):
+    lines = [f"Memory {report.stage}: peak {report.peak / MB:.1f} MB, "
+             f"still allocated {report.current / MB:.1f} MB, {report.seconds:.1f} s"]
+    for stat in report.top:
+        frame = stat.traceback[0]
+        lines.append(f"    {stat.size_diff / 1024:+.0f} KB  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+def check_budgets(reports, budgets):
+    # budgets: {stage: peak in MB}, returns a message for every stage over its budget
+    violations = []
+    for report in reports:
+        budget = budgets.get(report.stage)
+        if budget is not None and report.peak > budget * MB:
+            violations.append(f"{report.stage} peaked at {report.peak / MB:.1f} MB, budget {budget} MB")
+    return violations
+
+
+# --- reference inputs for the budget check ---
+def reference_rows(count):
+    # synthetic verb and noun rows with the length of real ones
+    verb_rows = [[f"to verb {i}", f"verbieren{i}", f"verbiere{i}", f"verbierst{i}", f"verbiert{i}",
+                  f"verbieren{i}", f"verbiert{i}", f"verbieren{i}"] for i in range(count)]
+    subs_rows = [[f"the noun {i}", f"das Nomen{i}"] for i in range(count)]
+    return verb_rows, subs_rows
+
+
+def reference_clip(size):
+    # an mp3 frame header followed by padding, roughly the size of a gTTS clip of one word
+    return (b"\xff\xf3\x64\xc4" + bytes(size))[:size]
+
+
+def profile_reference(count, clip_size):
+    """Runs the local stages on reference inputs of count rows and returns their reports."""
+    from row_utils import VERB_FIELDS, SUBS_FIELDS, parse_rows, rows_to_text
+    from anki_utils import AudioSynthesizer, build_deck
+
+    class ReferenceSynthesizer(AudioSynthesizer):
+        # same futures and data uris as a real build, without the network
+        def synthesize(self, text):
+            return reference_clip(clip_size)
+
+    verb_rows, subs_rows = reference_rows(count)
+    verbs_text, subs_text = rows_to_text(verb_rows), rows_to_text(subs_rows)
+    del verb_rows, subs_rows
+    reports = []
+
+    with stage_memory("parse", enabled=True):
+        verb_rows, _ = parse_rows(verbs_text, len(VERB_FIELDS))
+        subs_rows, _ = parse_rows(subs_text, len(SUBS_FIELDS))
+    reports.append(STAGE_REPORTS[-1])
+
+    for kind, rows in (("verbs", verb_rows), ("subs", subs_rows)):
+        # the cache is off so every row gets its own clip, as with real words
+        synthesizer = ReferenceSynthesizer(cache=False)
+        try:
+            with stage_memory(f"deck_{kind}", enabled=True):
+                deck = build_deck(kind, "reference", rows, synthesizer)
+            reports.append(STAGE_REPORTS[-1])
+        finally:
+            synthesizer.close()
+        del deck
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the per-stage memory peaks against the reference budgets.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000],
+                        help="sizes of the reference inputs")
+    parser.add_argument("--clip-size", type=int, default=6000, help="bytes per audio clip")
+    args = parser.parse_args()
+
+    reference_budgets = get_config_section("profiling")["reference_budgets_mb"]
+    failed = False
+    for count in args.rows:
+        reports = profile_reference(count, args.clip_size)
+        violations = check_budgets(reports, reference_budgets.get(str(count), {}))
+        for violation in violations:
+            print(f"{count} rows: {violation}")
+        failed = failed or bool(violations)
+    if failed:
+        raise SystemExit(1)
+    print("All stages within their memory budgets.")
+
+
+if __name__ == "__main__":
+    main()
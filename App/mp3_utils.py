@@ -0,0 +1,86 @@
+# mp3_utils.py
+#
+# just enough mp3 frame parsing to glue clips together. a layer iii frame whose
+# side info and main data are all zero decodes to silence, so silence is made of
+# copies of the first frame header of a clip with an empty body.
+import math
+
+# kbit/s by bitrate index, layer iii only
+BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # mpeg 1
+    2: [22050, 24000, 16000],  # mpeg 2
+    0: [11025, 12000, 8000],  # mpeg 2.5
+}
+
+
+def skip_id3(data):
+    # offset of the first byte after an id3v2 tag, 0 without one
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size
+    return 0
+
+
+def parse_frame_header(data, offset=0):
+    """
+    Reads the layer iii frame header at offset.
+    Returns (version, sample_rate, samples_per_frame, frame_length) or None.
+    """
+    header = data[offset:offset + 4]
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    padding = (header[2] >> 1) & 0x01
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    if version == 3:
+        bitrate = BITRATES["mpeg1"][bitrate_index] * 1000
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        bitrate = BITRATES["mpeg2"][bitrate_index] * 1000
+        samples_per_frame = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+    return version, sample_rate, samples_per_frame, frame_length
+
+
+def silent_frames(clip, milliseconds):
+    # silence in the format of the clip, empty bytes if the clip doesn't start with a layer iii frame
+    offset = skip_id3(clip)
+    info = parse_frame_header(clip, offset)
+    if info is None or milliseconds <= 0:
+        return b""
+    header = bytearray(clip[offset:offset + 4])
+    header[1] |= 0x01  # no crc, a crc of the empty body would be wrong
+    header[2] &= 0xFD  # no padding byte
+    _, sample_rate, samples_per_frame, _ = info
+    frame_length = parse_frame_header(bytes(header))[3]
+    frame = bytes(header) + bytes(frame_length - 4)
+    count = math.ceil(milliseconds / 1000 * sample_rate / samples_per_frame)
+    return frame * count
+
+
+def join_clips(clips, silence_ms):
+    """
+    Concatenates mp3 clips with a short silence between them. Every clip starts
+    with a fresh bit reservoir, so frames can simply be appended.
+    """
+    clips = [clip for clip in clips if clip]
+    if not clips:
+        return b""
+    silence = silent_frames(clips[0], silence_ms)
+    parts = []
+    for index, clip in enumerate(clips):
+        if index:
+            parts.append(silence)
+        # id3 tags in the middle of a stream would be played as noise by some players
+        parts.append(clip[skip_id3(clip):])
+    return b"".join(parts)
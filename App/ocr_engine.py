@@ -0,0 +1,173 @@
+# ocr_engine.py
+import os
+import queue
+import shlex
+import threading
+import pytesseract
+from app_config import get_config_section
+from usage_ledger import record_timeout
+
+# tesserocr is optional, without it every image goes through the pytesseract subprocess
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+pytesseract.pytesseract.tesseract_cmd = 'C:/Program Files/Tesseract-OCR/tesseract.exe'
+
+OCR_LANG = "deu"
+
+
+def tesseract_config(options):
+    # page segmentation and engine mode passed on to tesseract
+    return f"--oem {options['oem']} --psm {options['psm']} {options['extra_args']}".strip()
+
+
+def tesserocr_variables(extra_args):
+    """
+    Maps the tesseract command line options of extra_args onto tesseract
+    variables for the C API: "-c name=value" and "--dpi N". Raises ValueError
+    for any other option, the caller then uses the tesseract process instead.
+    """
+    variables = {}
+    args = shlex.split(extra_args or "")
+    while args:
+        arg = args.pop(0)
+        if arg == "-c" and args and "=" in args[0]:
+            name, _, value = args.pop(0).partition("=")
+            variables[name] = value
+        elif arg.startswith("-c") and "=" in arg[2:]:
+            name, _, value = arg[2:].partition("=")
+            variables[name] = value
+        elif arg == "--dpi" and args:
+            variables["user_defined_dpi"] = args.pop(0)
+        else:
+            raise ValueError(f"tesserocr doesn't support the tesseract option '{arg}'")
+    return variables
+
+
+class PytesseractEngine:
+    """Runs one tesseract process per image. Always available, used as the fallback."""
+    name = "pytesseract"
+
+    def __init__(self, options):
+        self.config = tesseract_config(options)
+
+    def image_to_string(self, img):
+        # pytesseract kills the tesseract process when the deadline passes, the page is then retried
+        deadlines = get_config_section("deadlines")
+        for attempt in range(deadlines["ocr_retries"] + 1):
+            try:
+                return pytesseract.image_to_string(img, lang=OCR_LANG, config=self.config,
+                                                   timeout=deadlines["ocr_seconds"])
+            except RuntimeError as e:
+                if "timeout" not in str(e).lower():
+                    raise
+                record_timeout(self.name, "ocr")
+                print(f"Tesseract ran past {deadlines['ocr_seconds']} s, attempt {attempt + 1}.")
+        raise RuntimeError("Tesseract timed out on every attempt.")
+
+
+class TesserocrEngine:
+    """
+    Keeps tesseract loaded in process through the C API. Every api instance loads
+    the language model once and takes images straight from memory. Up to
+    pool_size instances are created lazily so worker threads can OCR in parallel.
+    """
+    name = "tesserocr"
+
+    def __init__(self, options):
+        self.options = options
+        # same extra_args as the tesseract process, so the output doesn't depend on the engine
+        self.variables = tesserocr_variables(options["extra_args"])
+        self.pool_size = options["engine_pool_size"] or os.cpu_count() or 1
+        self.apis = queue.Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+        # create the first instance right away so a missing tessdata fails here and not mid-run
+        self.apis.put(self.create_api())
+        # images whose in-process call gets stuck go to a tesseract process, which can be killed
+        self.fallback = PytesseractEngine(options)
+
+    def create_api(self):
+        kwargs = {"lang": OCR_LANG, "psm": self.options["psm"], "oem": self.options["oem"]}
+        if self.options["tessdata_path"]:
+            kwargs["path"] = self.options["tessdata_path"]
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in self.variables.items():
+            if not api.SetVariable(name, value):
+                api.End()
+                raise RuntimeError(f"Unknown tesseract variable '{name}'")
+        self.created += 1
+        return api
+
+    def acquire(self):
+        try:
+            return self.apis.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.pool_size:
+                return self.create_api()
+        return self.apis.get()
+
+    def image_to_string(self, img):
+        deadline = get_config_section("deadlines")["ocr_seconds"]
+        api = self.acquire()
+        result = {}
+
+        def recognize():
+            try:
+                api.SetImage(img)
+                result["text"] = api.GetUTF8Text()
+            except Exception as e:
+                result["error"] = e
+
+        # watchdog: the c api call can't be interrupted, so it runs in its own thread
+        worker = threading.Thread(target=recognize, daemon=True)
+        worker.start()
+        worker.join(deadline or None)
+        if worker.is_alive():
+            # the stuck instance is given up, a new one is created on demand
+            with self.lock:
+                self.created -= 1
+            record_timeout(self.name, "ocr")
+            print(f"tesserocr ran past {deadline} s, retrying the image with a tesseract process.")
+            return self.fallback.image_to_string(img)
+        self.apis.put(api)
+        if "error" in result:
+            raise result["error"]
+        return result["text"]
+
+    def close(self):
+        while not self.apis.empty():
+            self.apis.get_nowait().End()
+
+
+_engine = None
+_engine_options = None
+_engine_lock = threading.Lock()
+
+
+def create_ocr_engine(options):
+    # "auto" prefers the persistent engine and falls back to pytesseract
+    if options["engine"] in ("auto", "tesserocr") and tesserocr is not None:
+        try:
+            return TesserocrEngine(options)
+        except (RuntimeError, ValueError) as e:
+            print(f"Can't start tesserocr, falling back to pytesseract: {e}")
+    return PytesseractEngine(options)
+
+
+def get_ocr_engine():
+    # the engine is shared by all callers and only rebuilt when the ocr settings change
+    global _engine, _engine_options
+    options = get_config_section("ocr")
+    with _engine_lock:
+        if _engine is None or options != _engine_options:
+            if isinstance(_engine, TesserocrEngine):
+                _engine.close()
+            _engine = create_ocr_engine(options)
+            _engine_options = options
+            print(f"Using OCR engine: {_engine.name}")
+        return _engine
@@ -0,0 +1,296 @@
+# pipeline.py
+import os
+import queue
+import tempfile
+import threading
+from app_config import get_config_section
+from source_to_txt_utils import iter_pdf_pages, extract_text_from_image
+from ai_utils import (clean_tokenized_text, extract_verbs, extract_except_verbs, classify_and_enrich, repair_rows,
+                      process_units, run_stage_packed)
+from anki_utils import (AudioSynthesizer, MediaStore, DeckStream, write_media_package, package_path, source_path,
+                        record_notes, media_filename)
+from row_utils import VERB_FIELDS, SUBS_FIELDS, parse_rows, german_key
+from text_preprocess import dedupe_files, PageDeduper, clean_page, strip_running_lines
+
+# marks the end of a queue
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+class StreamingPipeline:
+    """
+    Optional streaming mode from files straight to packages. Pages go to the llm
+    in chunks as soon as they are extracted and parsed rows go to tts and note
+    building as soon as a chunk is answered, so ocr, llm and tts overlap.
+    Queues between the stages are bounded, a slow stage makes the earlier ones wait.
+    """
+
+    def __init__(self, file_paths, label, page_ranges=None, status=None, cancelled=None,
+                 packages_dir=None, sources_dir=None, regions=None, synthesizer=None):
+        self.file_paths = file_paths
+        self.label = label
+        self.page_ranges = page_ranges or {}
+        # crop region per path, files without one use the saved crop regions
+        self.regions = regions or {}
+        # a shared synthesizer (build service) is left open, otherwise the run has its own
+        self.synthesizer = synthesizer
+        self.status = status or print
+        # polled by every stage, e.g. a closed progress dialog
+        self.cancelled = cancelled
+        # None for the configured directories, a build service job uses its own
+        self.packages_dir = packages_dir
+        self.sources_dir = sources_dir
+        options = get_config_section("pipeline")
+        self.chunk_chars = options["chunk_chars"]
+        self.llm_workers = max(1, options["llm_workers"])
+        self.chunks = queue.Queue(maxsize=options["queue_size"])
+        self.rows = queue.Queue(maxsize=options["queue_size"])
+        self.stop_event = threading.Event()
+        self.error = None
+
+    def cancel(self):
+        self.stop_event.set()
+
+    def is_stopped(self):
+        if self.cancelled is not None and self.cancelled():
+            self.stop_event.set()
+        return self.stop_event.is_set()
+
+    def put(self, target, item):
+        # blocking put that gives up when the pipeline is stopped
+        while not self.is_stopped():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, source):
+        while not self.is_stopped():
+            try:
+                return source.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        raise PipelineCancelled()
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stop_event.set()
+
+    # --- stage 1: extraction ---
+    def iter_texts(self):
+        preprocess = get_config_section("preprocess")["enabled"]
+        file_paths = dedupe_files(self.file_paths) if preprocess else self.file_paths
+        deduper = PageDeduper() if preprocess else None
+        for path in file_paths:
+            if ".pdf" in path:
+                pages = (page_text for page_text, _ in
+                         iter_pdf_pages(path, self.page_ranges.get(path), self.regions.get(path)))
+            else:
+                pages = [extract_text_from_image(path, self.regions.get(path))]
+            for page_text in pages:
+                if deduper is not None:
+                    # running headers need several pages, they are stripped per chunk
+                    if deduper.is_duplicate(page_text):
+                        continue
+                    page_text = clean_page(page_text)
+                yield path, page_text
+
+    def join_chunk(self, pages):
+        if get_config_section("preprocess")["enabled"]:
+            pages = strip_running_lines(pages)
+        return "\n".join(pages)
+
+    def extract_stage(self):
+        # with packing every file is a unit of its own, its chunks are packed with other small units later
+        split_files = get_config_section("llm")["pack_units"]
+        try:
+            chunk = []
+            size = 0
+            chunk_path = None
+            for path, text in self.iter_texts():
+                if self.is_stopped():
+                    return
+                if split_files and chunk and path != chunk_path:
+                    if not self.put(self.chunks, self.join_chunk(chunk)):
+                        return
+                    chunk, size = [], 0
+                chunk_path = path
+                chunk.append(text)
+                size += len(text)
+                if size >= self.chunk_chars:
+                    if not self.put(self.chunks, self.join_chunk(chunk)):
+                        return
+                    chunk, size = [], 0
+            if chunk:
+                self.put(self.chunks, self.join_chunk(chunk))
+        except Exception as e:
+            self.fail(e)
+        finally:
+            for _ in range(self.llm_workers):
+                self.put(self.chunks, _DONE)
+
+    # --- stage 2: llm ---
+    def process_chunk(self, text):
+        return self.extract_rows(clean_tokenized_text(text))
+
+    def extract_rows(self, cleaned_text):
+        llm_options = get_config_section("llm")
+        structured_rows = None
+        if llm_options["structured_output"]:
+            try:
+                structured_rows = classify_and_enrich(cleaned_text)
+            except ValueError as e:
+                print(f"Structured output failed, using separate requests: {e}")
+        if structured_rows is not None:
+            verbs_text, except_verbs_text = structured_rows
+        else:
+            verbs_text = extract_verbs(cleaned_text)
+            except_verbs_text = extract_except_verbs(cleaned_text)
+        if llm_options["repair"]:
+            verbs_text, except_verbs_text = repair_rows(cleaned_text, verbs_text, except_verbs_text)
+        verb_rows, _ = parse_rows(verbs_text, len(VERB_FIELDS))
+        subs_rows, _ = parse_rows(except_verbs_text, len(SUBS_FIELDS))
+        return [("verbs", row) for row in verb_rows] + [("subs", row) for row in subs_rows]
+
+    def process_packed(self, texts):
+        # several chunks share one request per stage. the json classify request is not packed:
+        # with structured output only the clean stage is, then every unit is classified on its own
+        if get_config_section("llm")["structured_output"]:
+            items = []
+            for cleaned_text in run_stage_packed("clean", texts):
+                items += self.extract_rows(cleaned_text)
+            return items
+        items = []
+        for cleaned_text, verbs_text, except_verbs_text in process_units(texts):
+            if get_config_section("llm")["repair"]:
+                verbs_text, except_verbs_text = repair_rows(cleaned_text, verbs_text, except_verbs_text)
+            verb_rows, _ = parse_rows(verbs_text, len(VERB_FIELDS))
+            subs_rows, _ = parse_rows(except_verbs_text, len(SUBS_FIELDS))
+            items += [("verbs", row) for row in verb_rows] + [("subs", row) for row in subs_rows]
+        return items
+
+    def next_chunks(self):
+        # blocks for one chunk, with packing on also takes the chunks that are already waiting.
+        # it never waits for more, a single waiting chunk goes out alone.
+        # returns (texts, done), done once this worker's end marker was taken
+        text = self.get(self.chunks)
+        if text is _DONE:
+            return [], True
+        texts = [text]
+        options = get_config_section("llm")
+        if not options["pack_units"]:
+            return texts, False
+        size = len(text)
+        while len(texts) < options["pack_max_units"] and size < options["pack_max_chars"]:
+            try:
+                text = self.chunks.get_nowait()
+            except queue.Empty:
+                break
+            if text is _DONE:
+                return texts, True
+            texts.append(text)
+            size += len(text)
+        return texts, False
+
+    def llm_stage(self):
+        try:
+            while True:
+                texts, done = self.next_chunks()
+                if len(texts) == 1:
+                    items = self.process_chunk(texts[0])
+                else:
+                    items = self.process_packed(texts) if texts else []
+                for item in items:
+                    if not self.put(self.rows, item):
+                        return
+                if done:
+                    return
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.put(self.rows, _DONE)
+
+    # --- stage 3: tts and notes ---
+    def build_stage(self, streams, sources):
+        finished_workers = 0
+        seen = set()
+        count = 0
+        while finished_workers < self.llm_workers:
+            item = self.get(self.rows)
+            if item is _DONE:
+                finished_workers += 1
+                continue
+            if self.is_stopped():
+                raise PipelineCancelled()
+            kind, row = item
+            # chunks may overlap, a word is added once per unit
+            key = (kind, german_key(row[1]))
+            if key in seen:
+                continue
+            seen.add(key)
+            streams[kind].add(row)
+            sources[kind].write(";".join(row) + "\n")
+            count += 1
+            if count % 20 == 0:
+                self.status(f"{count} cards queued...")
+
+    def run(self):
+        """Runs the pipeline and returns the paths of the written packages."""
+        threads = [threading.Thread(target=self.extract_stage, daemon=True)]
+        threads += [threading.Thread(target=self.llm_stage, daemon=True) for _ in range(self.llm_workers)]
+        for thread in threads:
+            thread.start()
+
+        synthesizer = self.synthesizer or AudioSynthesizer(cache=False)
+        paths = []
+        # sources are written next to the old ones and only replace them once the packages exist,
+        # a failed or cancelled run keeps the previous sources
+        tmp_paths = {kind: source_path(kind, self.label, self.sources_dir) + ".tmp" for kind in ("verbs", "subs")}
+        try:
+            with tempfile.TemporaryDirectory() as media_dir:
+                media = MediaStore(media_dir)
+                streams = {kind: DeckStream(kind, self.label, synthesizer, media) for kind in ("verbs", "subs")}
+                sources = {kind: open(tmp_path, "w", encoding="utf-8") for kind, tmp_path in tmp_paths.items()}
+                try:
+                    self.build_stage(streams, sources)
+                except PipelineCancelled:
+                    pass
+                finally:
+                    for file in sources.values():
+                        file.close()
+                if self.error is not None:
+                    raise self.error
+                if self.is_stopped():
+                    raise PipelineCancelled("The pipeline was cancelled.")
+
+                self.status("Writing packages...")
+                for kind, stream in streams.items():
+                    deck = stream.finish()
+                    if deck.notes:
+                        path = package_path(kind, self.label, self.packages_dir)
+                        # both decks share the media store, each package only gets its own clips
+                        names = {media_filename(note.fields[-1]) for note in deck.notes}
+                        media_paths = [media.files[name] for name in names if name in media.files]
+                        write_media_package(deck, media_paths, path)
+                        if self.packages_dir is None:
+                            record_notes(kind, self.label, deck.notes)
+                        os.replace(tmp_paths[kind], source_path(kind, self.label, self.sources_dir))
+                        paths.append(path)
+        finally:
+            self.stop_event.set()
+            if self.synthesizer is None:
+                synthesizer.close()
+            for thread in threads:
+                thread.join(timeout=5)
+            for tmp_path in tmp_paths.values():
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return paths
@@ -0,0 +1,52 @@
+# row_utils.py
+
+# field layouts of the two card types, in the order they appear in the source files
+VERB_FIELDS = ["Front", "Back", "ich", "du", "er", "wir", "ihr", "sie"]
+SUBS_FIELDS = ["Front", "Back"]
+
+
+def split_row(line):
+    # split one "a;b;c" source line into stripped fields
+    return [field.strip() for field in line.split(";")]
+
+
+def validate_row(fields, field_count):
+    # returns an error message for a malformed row or an empty string if the row is fine
+    if len(fields) != field_count:
+        return f"Expected {field_count} fields, got {len(fields)}"
+    for index, field in enumerate(fields):
+        if not field:
+            return f"Field {index + 1} is empty"
+    return ""
+
+
+def german_key(text):
+    # normalized german side of an item or row, "die Hose / die Hosen" -> "die hose"
+    return " ".join(text.split("/")[0].lower().split())
+
+
+def iter_rows(lines, field_count):
+    # lazily parse source lines, yields (fields, error) for every non-empty line
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        fields = split_row(line)
+        yield fields, validate_row(fields, field_count)
+
+
+def parse_rows(text, field_count):
+    # parse source text into rows, returns (valid_rows, invalid_lines)
+    rows = []
+    invalid = []
+    for fields, error in iter_rows(text.splitlines(), field_count):
+        if error:
+            invalid.append(";".join(fields))
+        else:
+            rows.append(fields)
+    return rows, invalid
+
+
+def rows_to_text(rows):
+    # join rows back into the semicolon separated source format
+    return "\n".join(";".join(row) for row in rows)
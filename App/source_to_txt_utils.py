@@ -1,20 +1,278 @@
-from PIL import Image
-import pytesseract
+from PIL import Image, ImageOps, ImageFilter, ImageChops
 import pdfplumber
+import pypdfium2 as pdfium
+import threading
+import time
+from collections import namedtuple
+from app_config import get_config_section
+from ocr_engine import get_ocr_engine
+from crop_regions import get_crop_region, crop_image
 
-def extract_text_from_pdf(pdf_v_path):
-    text = ""
-    with pdfplumber.open(pdf_v_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text()
-    return text
+# a page is taken from a text layer only if it has at least this many letters
+MIN_PAGE_LETTERS = 20
+# text layers with words this long on average lost their spacing (tables, columns)
+MAX_AVG_WORD_LENGTH = 20
+# resolution used to rasterize pages without a text layer
+OCR_RENDER_DPI = 300
 
-pytesseract.pytesseract.tesseract_cmd = 'C:/Program Files/Tesseract-OCR/tesseract.exe'
+# one entry per processed pdf page: which extractor was used and how long it took
+PageReport = namedtuple("PageReport", ["path", "page", "method", "seconds", "chars"])
 
-def extract_text_from_image(image_path):
+
+# pdfium isn't thread-safe: every call into it, from any thread (thumbnails, extraction,
+# build service jobs), goes through this lock. ocr and pdfplumber run outside of it
+PDFIUM_LOCK = threading.RLock()
+
+
+def is_usable_text(text):
+    # checks that a text layer actually contains words and not just page numbers
+    return sum(ch.isalpha() for ch in text) >= MIN_PAGE_LETTERS
+
+
+def is_layout_broken(text):
+    # pdfium returns text in content stream order, glued words hint at a layout pdfplumber handles better
+    words = text.split()
+    if not words:
+        return False
+    return sum(len(word) for word in words) / len(words) > MAX_AVG_WORD_LENGTH
+
+
+def extract_pdfium_page_text(page, region=None):
+    with PDFIUM_LOCK:
+        textpage = page.get_textpage()
+        try:
+            if region is None:
+                return textpage.get_text_range()
+            # pdf coordinates start at the bottom left corner
+            left, top, right, bottom = region
+            width, height = page.get_size()
+            return textpage.get_text_bounded(
+                left=left * width, bottom=(1 - bottom) * height,
+                right=right * width, top=(1 - top) * height,
+            )
+        finally:
+            textpage.close()
+
+
+def extract_plumber_page_text(plumber_page, region=None):
+    if region is not None:
+        left, top, right, bottom = region
+        x0, top0, x1, bottom0 = plumber_page.bbox
+        width, height = x1 - x0, bottom0 - top0
+        plumber_page = plumber_page.crop((
+            x0 + left * width, top0 + top * height,
+            x0 + right * width, top0 + bottom * height,
+        ))
+    return plumber_page.extract_text() or ""
+
+
+def ocr_pdfium_page(page, region=None):
+    # rasterize the page (only the crop region if there is one) and run it through tesseract
+    options = get_config_section("ocr")
+    crop = (0, 0, 0, 0)
+    with PDFIUM_LOCK:
+        if region is not None:
+            # pdfium crops the given amount of points from each side: left, bottom, right, top
+            left, top, right, bottom = region
+            width, height = page.get_size()
+            crop = (left * width, (1 - bottom) * height, (1 - right) * width, top * height)
+        bitmap = page.render(scale=OCR_RENDER_DPI / 72, grayscale=True, crop=crop)
+        # to_pil shares the bitmap buffer, the copy is owned by python
+        img = bitmap.to_pil().copy()
+        bitmap.close()
+    if options["preprocess"]:
+        # rendered pages are already at the target resolution, only clean them up
+        img = preprocess_image(img, options, scale=1.0)
+    return get_ocr_engine().image_to_string(img)
+
+
+def parse_page_range(page_range, page_count):
+    """
+    Turns a page selection like "3-7, 12" into sorted 0-based page indices.
+    An empty selection means all pages, open ranges like "10-" run to the end.
+    """
+    if not page_range or not page_range.strip():
+        return list(range(page_count))
+    indices = set()
+    for part in page_range.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, _, last = part.partition("-")
+            first = int(first) if first.strip() else 1
+            last = int(last) if last.strip() else page_count
+        else:
+            first = last = int(part)
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: '{part}'")
+        indices.update(range(first - 1, min(last, page_count)))
+    return sorted(indices)
+
+
+def iter_pdf_pages(pdf_v_path, page_range=None, region=None):
+    """
+    Yields (page_text, PageReport) for the selected pages one at a time. Each page
+    is closed and its pdfplumber layout cache released as soon as its text is
+    extracted, so memory stays flat for long documents.
+    Per page: pdfium text layer first, pdfplumber for broken layouts, ocr for pages without text.
+    Only the crop region of the file is processed, if one is defined.
+    """
+    if region is None:
+        region = get_crop_region(pdf_v_path)
+    plumber_pdf = None
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_v_path)
+        page_count = len(pdf)
     try:
-        img = Image.open(image_path)
-        text = pytesseract.image_to_string(img, lang='deu')
+        for index in parse_page_range(page_range, page_count):
+            start = time.perf_counter()
+            with PDFIUM_LOCK:
+                page = pdf[index]
+            try:
+                page_text = extract_pdfium_page_text(page, region)
+                method = "pdfium"
+                if is_usable_text(page_text) and is_layout_broken(page_text):
+                    # pdfplumber is opened only once a page actually needs it
+                    if plumber_pdf is None:
+                        plumber_pdf = pdfplumber.open(pdf_v_path)
+                    plumber_page = plumber_pdf.pages[index]
+                    try:
+                        plumber_text = extract_plumber_page_text(plumber_page, region)
+                    finally:
+                        plumber_page.close()
+                    if is_usable_text(plumber_text):
+                        page_text = plumber_text
+                        method = "pdfplumber"
+                if not is_usable_text(page_text):
+                    page_text = ocr_pdfium_page(page, region)
+                    method = "ocr"
+            finally:
+                with PDFIUM_LOCK:
+                    page.close()
+
+            page_report = PageReport(pdf_v_path, index + 1, method, time.perf_counter() - start, len(page_text))
+            print(f"[PDF] {page_report.path} page {page_report.page}: {page_report.method}, "
+                  f"{page_report.seconds:.2f}s, {page_report.chars} chars")
+            yield page_text, page_report
+    finally:
+        with PDFIUM_LOCK:
+            pdf.close()
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+
+
+def extract_text_from_pdf(pdf_v_path, report=None, page_range=None, region=None):
+    pages = []
+    for page_text, page_report in iter_pdf_pages(pdf_v_path, page_range, region):
+        if report is not None:
+            report.append(page_report)
+        pages.append(page_text)
+    return "\n".join(pages) + "\n" if pages else ""
+
+
+def ocr_scale(img, options):
+    # scale factor that brings the image to the target dpi, never upscales
+    dpi = img.info.get("dpi")
+    if dpi and dpi[0] > 72:
+        scale = options["target_dpi"] / dpi[0]
+    else:
+        # phone photos usually report 72 dpi or nothing, assume the photo shows one page
+        scale = options["target_dpi"] * options["page_long_side_inches"] / max(img.size)
+    return min(1.0, scale)
+
+
+def load_image_for_ocr(image_path, options):
+    # returns the opened image and the scale still to apply after decoding
+    img = Image.open(image_path)
+    if not options["preprocess"]:
+        return img, 1.0
+    scale = ocr_scale(img, options)
+    if img.format == "JPEG" and scale < 1.0:
+        target_size = (int(img.width * scale), int(img.height * scale))
+        # draft mode lets the jpeg decoder skip detail by decoding at 1/2, 1/4 or 1/8 size
+        img.draft("L", target_size)
+        scale = target_size[0] / img.width
+    return img, scale
+
+
+def binarize_image(img, window, offset):
+    # adaptive threshold: pixels darker than their local mean by more than offset become black
+    local_mean = img.filter(ImageFilter.BoxBlur(window // 2))
+    darkness = ImageChops.subtract(local_mean, img)
+    table = [0 if value > offset else 255 for value in range(256)]
+    return darkness.point(table)
+
+
+def estimate_skew(img, max_degrees):
+    # projection profile: text lines give the sharpest row profile when they are horizontal
+    small = img.copy()
+    small.thumbnail((800, 800))
+    inverted = ImageOps.invert(small)
+    best_angle, best_score = 0.0, -1.0
+    steps = int(max_degrees * 4)
+    for step in range(-steps, steps + 1):
+        angle = step / 4
+        rotated = inverted.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+        profile = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(profile) / len(profile)
+        score = sum((value - mean) ** 2 for value in profile)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess_image(img, options, scale=None):
+    # orientation, grayscale, downscaling, deskew and binarization in front of ocr
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("L")
+    if scale is None:
+        scale = ocr_scale(img, options)
+    if scale < 1.0:
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+    if options["deskew"]:
+        angle = estimate_skew(img, options["max_skew_degrees"])
+        if angle:
+            img = img.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    if options["binarize"]:
+        img = binarize_image(img, options["binarize_window"], options["binarize_offset"])
+    return img
+
+
+def extract_text_from_image(image_path, region=None):
+    try:
+        options = get_config_section("ocr")
+        img, scale = load_image_for_ocr(image_path, options)
+        if region is None:
+            region = get_crop_region(image_path)
+        if region is not None:
+            # only the crop region is preprocessed and recognized
+            img = crop_image(ImageOps.exif_transpose(img), region)
+        if options["preprocess"]:
+            img = preprocess_image(img, options, scale=scale)
+        text = get_ocr_engine().image_to_string(img)
         return text
     except Exception as e:
-        return f"Ошибка при обработке {image_path}: {e}"
\ No newline at end of file
+        return f"Ошибка при обработке {image_path}: {e}"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract text from PDF files and images.")
+    parser.add_argument("paths", nargs="+", help="PDF or image files")
+    parser.add_argument("--pages", default=None, help="page selection for PDFs, e.g. 3-7,12")
+    parser.add_argument("-o", "--output", default=None, help="write the text to this file instead of stdout")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        for path in args.paths:
+            if ".pdf" in path:
+                # pages are written as they come, the document is never held as a whole
+                for page_text, _ in iter_pdf_pages(path, args.pages):
+                    print(page_text, file=out)
+            else:
+                print(extract_text_from_image(path), file=out)
+    finally:
+        if out is not None:
+            out.close()
@@ -0,0 +1,235 @@
+# table_editor.py
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableView,
+    QPlainTextEdit, QStackedWidget, QHeaderView
+)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor
+from row_utils import split_row, validate_row
+
+INVALID_ROW_COLOR = QColor("#5c2b2b")
+
+
+class ValidationSignals(QObject):
+    finished = pyqtSignal(int, dict)  # (generation, {row_index: error_message})
+
+
+class ValidationTask(QRunnable):
+    """Validates a snapshot of the rows on the global thread pool."""
+
+    def __init__(self, generation, rows, field_count):
+        super().__init__()
+        self.generation = generation
+        self.rows = rows
+        self.field_count = field_count
+        self.signals = ValidationSignals()
+
+    def run(self):
+        errors = {}
+        for index, fields in enumerate(self.rows):
+            error = validate_row(fields, self.field_count)
+            if error:
+                errors[index] = error
+        self.signals.finished.emit(self.generation, errors)
+
+
+class RowsTableModel(QAbstractTableModel):
+    """
+    Table model over parsed source rows. Rows are handed to the view in batches
+    (fetchMore), so only the visible part of a large result set is ever rendered.
+    """
+    BATCH_SIZE = 500
+
+    validation_done = pyqtSignal(int)  # number of invalid rows
+
+    def __init__(self, field_names, parent=None):
+        super().__init__(parent)
+        self.field_names = field_names
+        self.rows = []
+        self.errors = {}
+        self.loaded_count = 0
+        self.generation = 0
+        # generation of the last whole-set result, behind self.generation while a validation runs
+        self.validated_generation = 0
+
+    # --- loading ---
+    def set_text(self, text):
+        self.beginResetModel()
+        self.rows = [split_row(line) for line in text.splitlines() if line.strip()]
+        self.errors = {}
+        self.loaded_count = min(len(self.rows), self.BATCH_SIZE)
+        self.endResetModel()
+        self.validate()
+
+    def to_text(self):
+        return "\n".join(";".join(fields) for fields in self.rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded_count < len(self.rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        remaining = len(self.rows) - self.loaded_count
+        amount = min(remaining, self.BATCH_SIZE)
+        if amount <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded_count, self.loaded_count + amount - 1)
+        self.loaded_count += amount
+        self.endInsertRows()
+
+    # --- validation ---
+    def validate(self):
+        # validation of the whole set runs in the background, stale results are dropped by generation
+        self.generation += 1
+        snapshot = [list(fields) for fields in self.rows]
+        task = ValidationTask(self.generation, snapshot, len(self.field_names))
+        task.signals.finished.connect(self.on_validation_finished)
+        QThreadPool.globalInstance().start(task)
+
+    def on_validation_finished(self, generation, errors):
+        if generation != self.generation:
+            return
+        self.validated_generation = generation
+        self.errors = errors
+        if self.loaded_count:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(self.loaded_count - 1, len(self.field_names) - 1),
+                [Qt.BackgroundRole, Qt.ToolTipRole]
+            )
+        self.validation_done.emit(len(errors))
+
+    # --- model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.field_names)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.field_names[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        fields = self.rows[row]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            column = index.column()
+            # extra fields of a malformed row are shown joined in the last column
+            if column == len(self.field_names) - 1 and len(fields) > len(self.field_names):
+                return ";".join(fields[column:])
+            return fields[column] if column < len(fields) else ""
+        if role == Qt.BackgroundRole and row in self.errors:
+            return INVALID_ROW_COLOR
+        if role == Qt.ToolTipRole and row in self.errors:
+            return self.errors[row]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row = index.row()
+        column = index.column()
+        fields = self.rows[row]
+        if column == len(self.field_names) - 1 and len(fields) > len(self.field_names):
+            del fields[column:]
+        while len(fields) <= column:
+            fields.append("")
+        # an edited cell may contain separators, re-split so the row keeps the file format
+        fields[column:column + 1] = split_row(str(value))
+        if self.validated_generation != self.generation:
+            # a running whole-set validation has a snapshot without this edit, start over with a fresh one
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.field_names) - 1))
+            self.validate()
+            return True
+        # a single edited row is cheap enough to re-validate right away
+        error = validate_row(fields, len(self.field_names))
+        if error:
+            self.errors[row] = error
+        else:
+            self.errors.pop(row, None)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.field_names) - 1))
+        self.validation_done.emit(len(self.errors))
+        return True
+
+
+class TableEditor(QWidget):
+    """
+    Editor for one result set. Shows the rows in a table with a column per field
+    and allows switching to raw text editing. Keeps the QTextEdit-like
+    setPlainText/toPlainText interface used by the main window.
+    """
+
+    def __init__(self, field_names, parent=None):
+        super().__init__(parent)
+        self.model = RowsTableModel(field_names, self)
+        self.model.validation_done.connect(self.update_status)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        # toolbar
+        top_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #aaaaaa;")
+        self.raw_btn = QPushButton("Raw text")
+        self.raw_btn.setCheckable(True)
+        self.raw_btn.toggled.connect(self.toggle_raw_mode)
+        top_layout.addWidget(self.status_label)
+        top_layout.addStretch()
+        top_layout.addWidget(self.raw_btn)
+        layout.addLayout(top_layout)
+
+        # table and raw text views
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # fixed row heights keep scrolling cheap for large sets
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(24)
+
+        self.raw_edit = QPlainTextEdit()
+
+        self.views = QStackedWidget()
+        self.views.addWidget(self.table_view)  # index 0
+        self.views.addWidget(self.raw_edit)  # index 1
+        layout.addWidget(self.views)
+
+    def toggle_raw_mode(self, raw):
+        if raw:
+            self.raw_edit.setPlainText(self.model.to_text())
+            self.views.setCurrentIndex(1)
+        else:
+            self.model.set_text(self.raw_edit.toPlainText())
+            self.views.setCurrentIndex(0)
+
+    def update_status(self, invalid_count):
+        total = len(self.model.rows)
+        if invalid_count:
+            self.status_label.setText(f"{total} rows, {invalid_count} malformed")
+        else:
+            self.status_label.setText(f"{total} rows")
+
+    def setPlainText(self, text):
+        if self.raw_btn.isChecked():
+            self.raw_edit.setPlainText(text)
+        self.model.set_text(text)
+        self.update_status(0)
+
+    def toPlainText(self):
+        if self.raw_btn.isChecked():
+            return self.raw_edit.toPlainText()
+        return self.model.to_text()
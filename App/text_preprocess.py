@@ -0,0 +1,126 @@
+# text_preprocess.py
+import hashlib
+import re
+from collections import Counter
+from app_config import get_config_section
+
+SHINGLE_SIZE = 5
+# lines at the top and bottom of a page that are checked for running headers and footers
+HEADER_LINES = 3
+
+HYPHEN_BREAK = re.compile(r"(\w)[-\u00ad]\n\s*([a-zäöüß])")
+
+
+def estimate_tokens(text):
+    # rough estimate, about four characters per token
+    return len(text) // 4
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedupe_files(paths):
+    # drops files with identical content (the same scan selected twice), keeps the order
+    seen = set()
+    unique = []
+    for path in paths:
+        digest = file_hash(path)
+        if digest in seen:
+            print(f"Skipping duplicate file: {path}")
+            continue
+        seen.add(digest)
+        unique.append(path)
+    return unique
+
+
+def shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {hash(" ".join(words[i:i + SHINGLE_SIZE])) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+class PageDeduper:
+    """Recognizes pages that are identical or nearly identical to an earlier page."""
+
+    def __init__(self, threshold=None):
+        if threshold is None:
+            threshold = get_config_section("preprocess")["near_duplicate_threshold"]
+        self.threshold = threshold
+        self.seen = []
+
+    def is_duplicate(self, text):
+        current = shingles(text)
+        if not current:
+            return False
+        for previous in self.seen:
+            union = len(current | previous)
+            if union and len(current & previous) / union >= self.threshold:
+                return True
+        self.seen.append(current)
+        return False
+
+
+def line_key(line):
+    # page numbers differ between headers, compare lines without digits
+    return re.sub(r"\d+", "#", line.strip().lower())
+
+
+def strip_running_lines(pages):
+    # removes lines that repeat at the top or bottom of many pages (running headers and footers)
+    min_share = get_config_section("preprocess")["header_min_share"]
+    if len(pages) < 3:
+        return pages
+    counts = Counter()
+    for page in pages:
+        lines = [line for line in page.splitlines() if line.strip()]
+        edge_lines = lines[:HEADER_LINES] + lines[-HEADER_LINES:]
+        counts.update({line_key(line) for line in edge_lines})
+    repeated = {key for key, count in counts.items() if count >= max(2, min_share * len(pages))}
+    if not repeated:
+        return pages
+    return ["\n".join(line for line in page.splitlines() if line_key(line) not in repeated) for page in pages]
+
+
+def is_noise_line(line):
+    # lines without real words: page numbers, table rules, ocr garbage
+    stripped = line.strip()
+    if not stripped:
+        return False
+    letters = sum(ch.isalpha() for ch in stripped)
+    if letters < 2:
+        return True
+    return letters / len(stripped.replace(" ", "")) < 0.5
+
+
+def clean_page(text):
+    text = HYPHEN_BREAK.sub(r"\1\2", text)
+    return "\n".join(line for line in text.splitlines() if line.strip() and not is_noise_line(line))
+
+
+def preprocess_pages(pages, deduper=None):
+    """
+    Local cleanup of extracted pages before the llm: near-duplicate pages are
+    dropped, running headers and footers removed, hyphenated line breaks joined
+    and noise lines dropped. Returns (text, report) with token estimates.
+    """
+    input_text = "\n".join(pages)
+    deduper = deduper or PageDeduper()
+    unique_pages = [page for page in pages if not deduper.is_duplicate(page)]
+    cleaned_pages = [clean_page(page) for page in strip_running_lines(unique_pages)]
+    text = "\n".join(page for page in cleaned_pages if page)
+
+    report = {
+        "pages": len(pages),
+        "duplicate_pages": len(pages) - len(unique_pages),
+        "input_tokens": estimate_tokens(input_text),
+        "output_tokens": estimate_tokens(text),
+    }
+    print(f"Preprocessing: {report['pages']} pages, {report['duplicate_pages']} duplicates, "
+          f"~{report['input_tokens']} -> ~{report['output_tokens']} tokens")
+    return text, report
@@ -0,0 +1,226 @@
+# usage_ledger.py
+import sqlite3
+import threading
+import datetime
+from app_config import get_config_section
+
+USAGE_DB_FILE = "usage.db"
+
+_lock = threading.Lock()
+
+
+def connect():
+    conn = sqlite3.connect(USAGE_DB_FILE, timeout=10)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS usage (
+            day TEXT NOT NULL,
+            key_name TEXT NOT NULL,
+            model TEXT NOT NULL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_total REAL NOT NULL DEFAULT 0,
+            rate_limited INTEGER NOT NULL DEFAULT 0,
+            timed_out INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, key_name, model)
+        )
+    """)
+    # ledgers from before the deadlines have no timeout column yet
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(usage)")]
+    if "timed_out" not in columns:
+        conn.execute("ALTER TABLE usage ADD COLUMN timed_out INTEGER NOT NULL DEFAULT 0")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS model_stats (
+            day TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            model TEXT NOT NULL,
+            calls INTEGER NOT NULL DEFAULT 0,
+            accepted INTEGER NOT NULL DEFAULT 0,
+            latency_total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, stage, model)
+        )
+    """)
+    return conn
+
+
+def today():
+    # groq resets daily limits at midnight utc
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+def _add(key_name, model, requests=0, prompt_tokens=0, completion_tokens=0, latency=0.0, rate_limited=0,
+         timed_out=0):
+    with _lock:
+        conn = connect()
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO usage (day, key_name, model, requests, prompt_tokens,
+                                       completion_tokens, latency_total, rate_limited, timed_out)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (day, key_name, model) DO UPDATE SET
+                        requests = requests + excluded.requests,
+                        prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                        completion_tokens = completion_tokens + excluded.completion_tokens,
+                        latency_total = latency_total + excluded.latency_total,
+                        rate_limited = rate_limited + excluded.rate_limited,
+                        timed_out = timed_out + excluded.timed_out
+                """, (today(), key_name, model, requests, prompt_tokens, completion_tokens, latency, rate_limited,
+                      timed_out))
+        finally:
+            conn.close()
+
+
+def record_request(key_name, model, prompt_tokens, completion_tokens, latency):
+    _add(key_name, model, requests=1, prompt_tokens=prompt_tokens,
+         completion_tokens=completion_tokens, latency=latency)
+
+
+def record_rate_limit(key_name, model):
+    _add(key_name, model, rate_limited=1)
+
+
+def record_timeout(key_name, model):
+    # a call that ran past its deadline, also used for ocr ("tesseract", "ocr") and tts ("gtts", "tts")
+    _add(key_name, model, timed_out=1)
+
+
+def record_model_result(stage, model, accepted, latency):
+    # one answer of a model for a pipeline stage and whether it passed validation
+    with _lock:
+        conn = connect()
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO model_stats (day, stage, model, calls, accepted, latency_total)
+                    VALUES (?, ?, ?, 1, ?, ?)
+                    ON CONFLICT (day, stage, model) DO UPDATE SET
+                        calls = calls + 1,
+                        accepted = accepted + excluded.accepted,
+                        latency_total = latency_total + excluded.latency_total
+                """, (today(), stage, model, int(accepted), latency))
+        finally:
+            conn.close()
+
+
+def get_model_stats(stage=None):
+    # accept rate and average latency per stage and model over all days, for tuning the tiers
+    query = """
+        SELECT stage, model, SUM(calls), SUM(accepted), SUM(latency_total)
+        FROM model_stats
+    """
+    params = []
+    if stage is not None:
+        query += " WHERE stage = ?"
+        params.append(stage)
+    query += " GROUP BY stage, model ORDER BY stage, model"
+    with _lock:
+        conn = connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+    return [
+        {
+            "stage": stage_name,
+            "model": model,
+            "calls": calls,
+            "accept_rate": accepted / calls if calls else 0.0,
+            "avg_latency": latency / calls if calls else 0.0,
+        }
+        for stage_name, model, calls, accepted, latency in rows
+    ]
+
+
+def get_usage(key_name, model=None, day=None):
+    # summed usage of one key for a day, over all models unless a model is given
+    query = """
+        SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(prompt_tokens), 0),
+               COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(latency_total), 0),
+               COALESCE(SUM(rate_limited), 0), COALESCE(SUM(timed_out), 0)
+        FROM usage WHERE day = ? AND key_name = ?
+    """
+    params = [day or today(), key_name]
+    if model is not None:
+        query += " AND model = ?"
+        params.append(model)
+    with _lock:
+        conn = connect()
+        try:
+            requests, prompt, completion, latency, rate_limited, timed_out = conn.execute(query, params).fetchone()
+        finally:
+            conn.close()
+    return {
+        "requests": requests,
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "avg_latency": latency / requests if requests else 0.0,
+        "rate_limited": rate_limited,
+        "timed_out": timed_out,
+    }
+
+
+def remaining_daily_budget(key_name, model):
+    # (tokens, requests) left today for a key and model, None means no configured limit
+    limits = get_config_section("usage")
+    usage = get_usage(key_name, model)
+    token_limit = limits["daily_token_limits"].get(model)
+    request_limit = limits["daily_request_limits"].get(model)
+    tokens_left = None
+    requests_left = None
+    if token_limit is not None:
+        tokens_left = max(0, token_limit - usage["prompt_tokens"] - usage["completion_tokens"])
+    if request_limit is not None:
+        requests_left = max(0, request_limit - usage["requests"])
+    return tokens_left, requests_left
+
+
+def has_budget(key_name, model, estimated_tokens):
+    tokens_left, requests_left = remaining_daily_budget(key_name, model)
+    if requests_left is not None and requests_left < 1:
+        return False
+    return tokens_left is None or tokens_left >= estimated_tokens
+
+
+def estimate_tokens(messages):
+    # rough estimate, about four characters per token
+    return sum(len(message["content"]) for message in messages) // 4
+
+
+def format_usage(usage):
+    # short one line summary for the settings page
+    tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+    text = f"{usage['requests']} req, {tokens / 1000:.1f}k tok"
+    if usage["rate_limited"]:
+        text += f", {usage['rate_limited']}x429"
+    if usage["timed_out"]:
+        text += f", {usage['timed_out']}x timeout"
+    return text
+
+
+def get_timeout_stats(day=None):
+    # timeouts per key or service and model for a day, e.g. {("gtts", "tts"): 3}
+    with _lock:
+        conn = connect()
+        try:
+            rows = conn.execute("""
+                SELECT key_name, model, SUM(timed_out) FROM usage
+                WHERE day = ? GROUP BY key_name, model HAVING SUM(timed_out) > 0
+            """, (day or today(),)).fetchall()
+        finally:
+            conn.close()
+    return {(key_name, model): count for key_name, model, count in rows}
+
+
+def format_timeout_stats(stats):
+    # one line per key or service, e.g. "gtts (tts): 3x timeout"
+    return "\n".join(f"{key_name} ({model}): {count}x timeout" for (key_name, model), count in sorted(stats.items()))
+
+
+def format_model_stats(stats):
+    # one line per stage and model, e.g. "clean llama-3.3-70b-versatile: 42 calls, 95% accepted, 1.8 s"
+    return "\n".join(
+        f"{item['stage']} {item['model']}: {item['calls']} calls, {item['accept_rate']:.0%} accepted, "
+        f"{item['avg_latency']:.1f} s"
+        for item in stats
+    )
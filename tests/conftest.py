@@ -0,0 +1,40 @@
+# conftest.py
+#
+# the app modules live flat in App/ and read config.json, api_keys.json and usage.db
+# from the working directory, so every test runs in its own empty directory
+import os
+import sys
+import tempfile
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "App")
+sys.path.insert(0, APP_DIR)
+
+# test modules import ai_utils at collection time, before any fixture runs
+os.chdir(tempfile.mkdtemp(prefix="app_tests_"))
+with open("api_keys.json", "w", encoding="utf-8") as f:
+    f.write("[]")
+
+from app_config import reload_config  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "api_keys.json").write_text("[]", encoding="utf-8")
+    reload_config()
+    yield tmp_path
+    reload_config()
+
+
+@pytest.fixture
+def config(app_dir):
+    # writes config.json overrides for the test, e.g. config({"tts": {"segment_verbs": True}})
+    import json
+
+    def write(overrides):
+        (app_dir / "config.json").write_text(json.dumps(overrides), encoding="utf-8")
+        reload_config()
+
+    return write
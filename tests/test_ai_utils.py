@@ -0,0 +1,101 @@
+import pytest
+
+import ai_utils
+from ai_utils import pack_sections, split_sections, pack_groups, validate_rows, repair_rows, structured_to_rows
+
+GEHEN = "to go;gehen;gehe;gehst;geht;gehen;geht;gehen"
+
+
+def test_split_sections_round_trip():
+    texts = ["das Haus\nder Baum", "", "gehen"]
+    assert split_sections(pack_sections(texts), 3) == ["das Haus\nder Baum", "", "gehen"]
+
+
+def test_split_sections_tolerates_header_variants():
+    content = "## unit 1\ndas Haus\n\n#UNIT 2  \ngehen\n"
+    assert split_sections(content, 2) == ["das Haus", "gehen"]
+
+
+@pytest.mark.parametrize("content", [
+    "### UNIT 1\ndas Haus",  # a section missing
+    "### UNIT 1\na\n### UNIT 1\nb",  # a section twice
+    "### UNIT 1\na\n### UNIT 3\nb",  # wrong numbers
+    "das Haus\ngehen",  # no sections at all
+])
+def test_split_sections_rejects_mismatches(content):
+    assert split_sections(content, 2) is None
+
+
+def test_pack_groups_respects_limits(config):
+    config({"llm": {"pack_max_units": 2, "pack_max_chars": 10}})
+    assert pack_groups(["aaaa", "bbbb", "cccc", "dddddddddddd", "e"]) == [[0, 1], [2], [3], [4]]
+
+
+def test_validate_rows():
+    cleaned = "gehen\ndas Haus\nder Baum"
+    verbs = GEHEN + "\nto run;laufen;broken"
+    subs = "the house;das Haus\nthe house;das Haus\nthe tree"
+    verb_rows, subs_rows, missing, malformed = validate_rows(cleaned, verbs, subs)
+    assert verb_rows == [GEHEN.split(";")]
+    # duplicated words are kept once
+    assert subs_rows == [["the house", "das Haus"]]
+    assert missing == ["der Baum"]
+    assert malformed == (["to run;laufen;broken"], ["the tree"])
+
+
+def test_validate_rows_drops_malformed_lines_a_valid_row_covers():
+    _, _, missing, malformed = validate_rows("gehen", GEHEN + "\nto go;gehen", "")
+    assert missing == []
+    assert malformed == ([], [])
+
+
+def test_repair_rows_merges_repaired_items(config, monkeypatch):
+    config({"llm": {"max_repair_items": 10}})
+    asked = []
+
+    def classify(text):
+        asked.append(text)
+        return "", "the tree;der Baum"
+
+    monkeypatch.setattr(ai_utils, "classify_and_enrich", classify)
+    verbs_text, subs_text = repair_rows("gehen\nder Baum", GEHEN, "the tree")
+    # only the missing item is sent again
+    assert asked == ["der Baum"]
+    assert verbs_text == GEHEN
+    assert subs_text == "the tree;der Baum"
+
+
+def test_repair_rows_keeps_unrepaired_malformed_lines(config, monkeypatch):
+    config({"llm": {"max_repair_items": 10}})
+
+    def classify(text):
+        raise ValueError("Structured request failed")
+
+    monkeypatch.setattr(ai_utils, "classify_and_enrich", classify)
+    verbs_text, subs_text = repair_rows("gehen\nder Baum", GEHEN, "the tree")
+    assert verbs_text == GEHEN
+    # the editor highlights the line for a manual fix
+    assert subs_text == "the tree"
+
+
+def test_repair_rows_skips_too_many_missing_items(config, monkeypatch):
+    config({"llm": {"max_repair_items": 1}})
+    monkeypatch.setattr(ai_utils, "classify_and_enrich", pytest.fail)
+    assert repair_rows("gehen\nder Baum\ndas Haus", GEHEN, "") == (GEHEN, "")
+
+
+def test_structured_to_rows():
+    verbs_text, subs_text = structured_to_rows({
+        "verbs": [{"english": "to go", "infinitive": "gehen", "ich": "gehe", "du": "gehst", "er": "geht",
+                   "wir": "gehen", "ihr": "geht", "sie": "gehen"}],
+        "nouns": [{"english": "the house", "singular": "das Haus", "plural": "die Häuser"}],
+        "other": [{"english": "this; that", "german": "dieser"}],
+    })
+    assert verbs_text == GEHEN
+    assert subs_text == "the house;das Haus / die Häuser\nthis, that;dieser"
+
+
+@pytest.mark.parametrize("data", [[], {"verbs": ["gehen"]}, {"nouns": {"english": "the house"}}])
+def test_structured_to_rows_rejects_bad_shapes(data):
+    with pytest.raises(ValueError):
+        structured_to_rows(data)
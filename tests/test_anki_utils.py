@@ -0,0 +1,77 @@
+from anki_utils import CARD_TYPES, NoteGuids, note_guid, write_tsv, AudioSynthesizer
+
+GEHEN = ["to go", "gehen", "gehe", "gehst", "geht", "gehen", "geht", "gehen"]
+
+
+def test_note_guids_depend_on_the_unit_and_occurrence():
+    row = ["the bank", "die Bank"]
+    assert note_guid("subs", "Unit 1", row) != note_guid("subs", "Unit 2", row)
+    # a corrected translation keeps the guid
+    assert note_guid("subs", "Unit 1", row) == note_guid("subs", "Unit 1", ["the bench", "die Bank"])
+
+    guids = NoteGuids("subs", "Unit 1")
+    first, second = guids(row), guids(["the bench", "die  bank"])
+    assert first == note_guid("subs", "Unit 1", row)
+    assert second != first
+
+
+def read_tsv(path):
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    header = [line for line in lines if line.startswith("#")]
+    return header, lines[len(header):]
+
+
+def test_write_tsv(tmp_path):
+    rows = [["the house", "das Haus"], ["#1 hit", "der Hit"], ["the tab\tkey", "die Taste"]]
+    path = write_tsv("subs", "Unit 13", rows, str(tmp_path / "subs.txt"))
+    header, lines = read_tsv(path)
+
+    assert "#notetype:" + CARD_TYPES["subs"]["model_name"] in header
+    assert "#guid column:3" in header
+    assert "#columns:Front\tBack\tGUID" in header
+    guids = NoteGuids("subs", "Unit 13")
+    assert lines == [
+        f"the house\tdas Haus\t{guids(rows[0])}",
+        f'"#1 hit"\tder Hit\t{guids(rows[1])}',
+        f"the tab key\tdie Taste\t{guids(rows[2])}",
+    ]
+
+
+def test_write_tsv_never_starts_a_line_with_a_hash(tmp_path):
+    # base91 guids can start with "#", anki would skip such a line as a comment
+    rows = [[f"word {i}", f"das Wort{i}"] for i in range(20000)]
+    assert any(NoteGuids("subs", "Unit 1")(row).startswith("#") for row in rows)
+    _, lines = read_tsv(write_tsv("subs", "Unit 1", rows, str(tmp_path / "subs.txt")))
+    assert len(lines) == len(rows)
+
+
+def test_write_tsv_verbs(tmp_path):
+    header, lines = read_tsv(write_tsv("verbs", "Unit 13", [GEHEN], str(tmp_path / "verbs.txt")))
+    assert "#guid column:9" in header
+    assert lines[0].split("\t")[:8] == GEHEN
+
+
+def test_synthesizer_cache_is_bounded():
+    synthesizer = AudioSynthesizer(workers=1, max_cached=2)
+    try:
+        first = synthesizer.submit("eins", synthesize=lambda text: text.encode())
+        synthesizer.submit("zwei", synthesize=lambda text: text.encode())
+        assert synthesizer.submit("eins", synthesize=lambda text: text.encode()) is first
+        # "zwei" is the least recently used clip and is dropped
+        synthesizer.submit("drei", synthesize=lambda text: text.encode())
+        assert list(synthesizer.cache) == ["eins", "drei"]
+        assert first.result() == b"eins"
+    finally:
+        synthesizer.close()
+
+
+def test_streaming_synthesizer_keeps_no_segments(config):
+    config({"tts": {"segment_verbs": True, "segment_cache_dir": ""}})
+    synthesizer = AudioSynthesizer(workers=1, cache=False)
+    synthesizer.synthesize = lambda text: text.encode()
+    try:
+        synthesizer.submit_row(CARD_TYPES["verbs"], GEHEN).result()
+        assert synthesizer.cache == {}
+    finally:
+        synthesizer.close()
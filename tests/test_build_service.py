@@ -0,0 +1,79 @@
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import build_service
+from build_service import BuildService, BuildRequestHandler, submit_job, wait_for_job, download_package
+
+LABEL = "Unit 13 Übung"
+
+
+class FakeBuildService(BuildService):
+    # writes a small file per job instead of running the llm and tts stages
+    def run_job(self, job):
+        packages_dir = os.path.join(self.job_dir(job), "packages")
+        os.makedirs(packages_dir, exist_ok=True)
+        path = os.path.join(packages_dir, f"en_to_deu_subs_{job.label}.apkg")
+        with open(path, "wb") as f:
+            f.write(job.payload["subs"].encode("utf-8"))
+        return [path]
+
+
+@pytest.fixture
+def service_url(config):
+    def start(token=""):
+        config({"service": {"token": token}})
+        BuildRequestHandler.service = FakeBuildService(workers=1)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), BuildRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_round_trip_with_spaces_and_umlauts(service_url, tmp_path):
+    url = service_url()
+    job = submit_job(url, {"label": f"  {LABEL} ", "subs": "the house;das Haus"})
+    assert job["label"] == LABEL
+
+    job = wait_for_job(url, job["id"], poll_seconds=0.05)
+    assert job["state"] == "done", job["message"]
+    assert job["packages"] == [f"en_to_deu_subs_{LABEL}.apkg"]
+
+    path = download_package(url, job["id"], job["packages"][0], str(tmp_path / "download.apkg"))
+    with open(path, "rb") as f:
+        assert f.read() == "the house;das Haus".encode("utf-8")
+
+
+def test_token_is_required_when_configured(service_url, monkeypatch):
+    url = service_url(token="secret")
+    submit_job(url, {"label": LABEL, "subs": "the house;das Haus"})
+
+    monkeypatch.setattr(build_service, "auth_headers", lambda: {})
+    with pytest.raises(build_service.httpx.HTTPStatusError) as error:
+        submit_job(url, {"label": LABEL, "subs": "the house;das Haus"})
+    assert error.value.response.status_code == 401
+
+
+def test_rejected_labels(config):
+    config({})
+    service = FakeBuildService(workers=1)
+    for label in ("", "   ", "../Unit 13", "a/b"):
+        with pytest.raises(ValueError):
+            service.submit({"label": label, "subs": "the house;das Haus"})
+    with pytest.raises(ValueError):
+        service.submit({"label": LABEL})
+
+
+def test_parse_region_payload():
+    assert build_service.parse_region_payload([0, 0.5, 1, 1]) == (0.0, 0.5, 1.0, 1.0)
+    for region in ([0, 0, 1], [0.5, 0, 0.2, 1], "0,0,1,1"):
+        with pytest.raises(ValueError):
+            build_service.parse_region_payload(region)
@@ -0,0 +1,24 @@
+# per-stage memory regressions: the local build stages run on reference inputs of
+# 1k and 10k rows and every stage has to stay within profiling.reference_budgets_mb
+import pytest
+
+from app_config import get_config_section
+from memory_profile import StageMemory, check_budgets, profile_reference, MB
+
+CLIP_SIZE = 6000
+
+
+@pytest.mark.parametrize("count", [1000, 10000])
+def test_reference_stages_within_budget(count, capsys):
+    budgets = get_config_section("profiling")["reference_budgets_mb"][str(count)]
+    reports = profile_reference(count, CLIP_SIZE)
+    assert {report.stage for report in reports} == set(budgets)
+    assert check_budgets(reports, budgets) == []
+
+
+def test_check_budgets_reports_stages_over_budget():
+    reports = [StageMemory("parse", 3 * MB, 0, 0.1, []), StageMemory("deck_subs", 10 * MB, 0, 0.1, [])]
+    violations = check_budgets(reports, {"parse": 2, "deck_subs": 25})
+    assert violations == ["parse peaked at 3.0 MB, budget 2 MB"]
+    # stages without a budget are not checked
+    assert check_budgets(reports, {}) == []
@@ -0,0 +1,48 @@
+from mp3_utils import skip_id3, parse_frame_header, silent_frames, join_clips
+
+# mpeg 2 layer iii, 32 kbit/s, 24 kHz, no crc: 144 byte frames of 576 samples
+HEADER = b"\xff\xf3\x44\xc4"
+FRAME_LENGTH = 72 * 32000 // 24000
+
+
+def clip(frames, fill=b"\x55"):
+    return (HEADER + fill * (FRAME_LENGTH - 4)) * frames
+
+
+def id3(payload):
+    size = len(payload)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x03\x00\x00" + syncsafe + payload
+
+
+def test_parse_frame_header():
+    assert parse_frame_header(HEADER) == (2, 24000, 576, FRAME_LENGTH)
+    assert parse_frame_header(b"\x00\x00\x00\x00") is None
+    # layer ii is not supported
+    assert parse_frame_header(b"\xff\xf5\x44\xc4") is None
+
+
+def test_skip_id3():
+    tagged = id3(b"\x00" * 20) + clip(1)
+    assert skip_id3(tagged) == 30
+    assert skip_id3(clip(1)) == 0
+
+
+def test_silent_frames_cover_the_duration():
+    silence = silent_frames(clip(1), 300)
+    # 300 ms at 24 kHz are 7200 samples, 13 frames of 576 samples
+    assert len(silence) == 13 * FRAME_LENGTH
+    assert parse_frame_header(silence) is not None
+    assert set(silence[4:FRAME_LENGTH]) == {0}
+    assert silent_frames(b"not an mp3", 300) == b""
+    assert silent_frames(clip(1), 0) == b""
+
+
+def test_join_clips():
+    first, second = clip(2, b"\x11"), clip(3, b"\x22")
+    joined = join_clips([id3(b"\x00" * 10) + first, b"", second], 100)
+    silence = silent_frames(first, 100)
+    # the id3 tag is dropped, empty clips are skipped and silence goes between the clips
+    assert joined == first + silence + second
+    assert join_clips([], 100) == b""
+    assert join_clips([first], 100) == first
@@ -0,0 +1,24 @@
+import pytest
+
+from source_to_txt_utils import parse_page_range
+
+
+@pytest.mark.parametrize("page_range, expected", [
+    ("", [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]),
+    (None, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]),
+    ("3", [2]),
+    ("3-5, 1", [0, 2, 3, 4]),
+    ("8-", [7, 8, 9]),
+    ("-2", [0, 1]),
+    ("2-4, 3-5", [1, 2, 3, 4]),
+    # pages past the end of the document are ignored
+    ("9-20, 15", [8, 9]),
+])
+def test_parse_page_range(page_range, expected):
+    assert parse_page_range(page_range, 10) == expected
+
+
+@pytest.mark.parametrize("page_range", ["0", "5-3", "a", "1-b", "1,,x"])
+def test_parse_page_range_rejects_invalid_input(page_range):
+    with pytest.raises(ValueError):
+        parse_page_range(page_range, 10)
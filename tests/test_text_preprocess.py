@@ -0,0 +1,54 @@
+from text_preprocess import (PageDeduper, dedupe_files, strip_running_lines, is_noise_line, clean_page,
+                             preprocess_pages)
+
+WORDS = ["die Jacke", "der Mantel", "die Hose", "das Hemd", "der Rock", "die Bluse", "der Schuh", "die Tasche",
+         "der Koffer", "das Kleid", "anprobieren", "kaufen"]
+
+
+def page(number, words):
+    # running header and footer around the vocabulary of a page
+    return "\n".join(["Menschen A1 Kursbuch", "Lektion 13"] + words + [f"Seite {number}"])
+
+
+def test_dedupe_files(tmp_path):
+    paths = []
+    for name, content in (("a.png", b"scan 1"), ("b.png", b"scan 2"), ("c.png", b"scan 1")):
+        path = tmp_path / name
+        path.write_bytes(content)
+        paths.append(str(path))
+    assert dedupe_files(paths) == paths[:2]
+
+
+def test_page_deduper_finds_near_duplicates():
+    deduper = PageDeduper(threshold=0.8)
+    words = " ".join(f"wort{i}" for i in range(40))
+    assert not deduper.is_duplicate(words)
+    assert deduper.is_duplicate(words + " extra")
+    assert not deduper.is_duplicate(" ".join(f"anders{i}" for i in range(40)))
+    # pages without words are never duplicates
+    assert not deduper.is_duplicate("")
+
+
+def test_strip_running_lines():
+    pages = [page(number, WORDS[number * 3:number * 3 + 3]) for number in range(4)]
+    assert strip_running_lines(pages) == ["\n".join(WORDS[number * 3:number * 3 + 3]) for number in range(4)]
+    # two pages are too few to tell a header from content
+    assert strip_running_lines(pages[:2]) == pages[:2]
+
+
+def test_noise_lines_and_hyphenation():
+    assert is_noise_line("141")
+    assert is_noise_line("---- | ----")
+    assert not is_noise_line("die Jacke")
+    assert clean_page("die Brief-\n tasche\n\n12\nder Koffer") == "die Brieftasche\nder Koffer"
+    # a hyphen before a capital letter is kept, e.g. a compound with a noun
+    assert clean_page("die Ober-\nStufe") == "die Ober-\nStufe"
+
+
+def test_preprocess_pages_report():
+    pages = [page(number, WORDS[number * 4:number * 4 + 4]) for number in range(3)]
+    text, report = preprocess_pages(pages + [pages[1]])
+    assert report["pages"] == 4
+    assert report["duplicate_pages"] == 1
+    assert report["output_tokens"] < report["input_tokens"]
+    assert text.splitlines() == WORDS